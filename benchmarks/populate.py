@@ -0,0 +1,131 @@
+import hashlib
+import json
+
+import boto3
+
+REGIONS = ["us-east-1", "eu-west-1", "ap-southeast-1", "ap-northeast-1"]
+
+# Each scale describes one synthetic account. Stacks own one log group and one
+# bucket each, so that part of what is listed is not orphaned.
+SCALES = {
+    "small": {
+        "regions": 2,
+        "stacks": 5,
+        "log_groups": 200,
+        "buckets": 4,
+        "objects_per_bucket": 200,
+        "repositories": 4,
+        "images_per_repository": 20,
+    },
+    "medium": {
+        "regions": 3,
+        "stacks": 20,
+        "log_groups": 2000,
+        "buckets": 10,
+        "objects_per_bucket": 2000,
+        "repositories": 10,
+        "images_per_repository": 200,
+    },
+    "large": {
+        "regions": 4,
+        "stacks": 50,
+        "log_groups": 10000,
+        "buckets": 20,
+        "objects_per_bucket": 5000,
+        "repositories": 20,
+        "images_per_repository": 1000,
+    },
+}
+
+STACK_TEMPLATE = """
+Resources:
+  LogGroup:
+    Type: AWS::Logs::LogGroup
+    Properties:
+      LogGroupName: /benchmark/stack/{name}
+  Bucket:
+    Type: AWS::S3::Bucket
+    Properties:
+      BucketName: benchmark-stack-{name}
+"""
+
+
+def create_bucket(region: str, name: str, objects: int) -> None:
+    s3_client = boto3.client("s3", region_name=region)
+    if region == "us-east-1":
+        s3_client.create_bucket(Bucket=name)
+    else:
+        s3_client.create_bucket(
+            Bucket=name, CreateBucketConfiguration={"LocationConstraint": region}
+        )
+
+    for i in range(objects):
+        s3_client.put_object(Bucket=name, Key=f"prefix-{i % 10}/object-{i}", Body=b"x")
+
+
+def create_repository(region: str, name: str, images: int) -> None:
+    ecr_client = boto3.client("ecr", region_name=region)
+    ecr_client.create_repository(repositoryName=name)
+
+    config = hashlib.sha256(name.encode()).hexdigest()
+    for i in range(images):
+        # moto derives the image digest from the layers, so each image gets
+        # a layer of its own to be a distinct image rather than another tag.
+        layer = hashlib.sha256(f"{name}/{i}".encode()).hexdigest()
+        manifest = {
+            "schemaVersion": 2,
+            "mediaType": "application/vnd.docker.distribution.manifest.v2+json",
+            "config": {
+                "mediaType": "application/vnd.docker.container.image.v1+json",
+                "size": 1,
+                "digest": f"sha256:{config}",
+            },
+            "layers": [
+                {
+                    "mediaType": "application/vnd.docker.image.rootfs.diff.tar.gzip",
+                    "size": 1,
+                    "digest": f"sha256:{layer}",
+                }
+            ],
+        }
+        ecr_client.put_image(
+            repositoryName=name, imageManifest=json.dumps(manifest), imageTag=f"v{i}"
+        )
+
+
+def populate_region(region: str, scale: dict) -> None:
+    cf_client = boto3.client("cloudformation", region_name=region)
+    logs_client = boto3.client("logs", region_name=region)
+
+    for i in range(scale["stacks"]):
+        name = f"{region}-{i}"
+        cf_client.create_stack(
+            StackName=f"benchmark-stack-{i}",
+            TemplateBody=STACK_TEMPLATE.format(name=name),
+        )
+
+    for i in range(scale["log_groups"]):
+        logs_client.create_log_group(logGroupName=f"/benchmark/orphaned/{i}")
+
+    for i in range(scale["buckets"]):
+        create_bucket(
+            region, f"benchmark-orphaned-{region}-{i}", scale["objects_per_bucket"]
+        )
+
+    for i in range(scale["repositories"]):
+        create_repository(
+            region, f"benchmark-orphaned-{i}", scale["images_per_repository"]
+        )
+
+
+def populate(scale: dict) -> list[str]:
+    """
+    Create the synthetic account in the active moto backend and return the
+    regions that hold resources.
+    """
+    regions = REGIONS[: scale["regions"]]
+    # The mocked backend is not thread-safe, so regions are populated one by
+    # one.
+    for region in regions:
+        populate_region(region, scale)
+    return regions
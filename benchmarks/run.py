@@ -0,0 +1,192 @@
+"""
+Measure list, list -a and destroy against a synthetic account mocked by moto.
+
+Usage: python -m benchmarks.run [--scale medium] [--update-baseline]
+"""
+
+import io
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import redirect_stdout
+
+import fire
+from moto import mock_aws
+
+from benchmarks.populate import SCALES, populate
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Relative increase over the baseline that counts as a regression. Wall time
+# and memory vary from machine to machine, API call counts should not.
+TOLERANCES = {
+    "wall_time": 0.25,
+    "api_calls": 0.05,
+    "peak_memory_mb": 0.25,
+}
+
+
+class ApiCallCounter:
+    def __init__(self):
+        self.calls = Counter()
+
+    def __call__(self, event_name: str, **kwargs) -> None:
+        # event_name is "before-send.<service>.<Operation>".
+        self.calls[event_name.split(".", 1)[1]] += 1
+
+    def reset(self) -> None:
+        self.calls.clear()
+
+
+def measure(func, counter: ApiCallCounter) -> tuple[dict, str]:
+    """
+    Run func and return its measurements and what it printed.
+    """
+    counter.reset()
+    tracemalloc.reset_peak()
+    # The mocked account lives in the same process; only count what the run
+    # allocates on top of it.
+    memory_before = tracemalloc.get_traced_memory()[0]
+    output = io.StringIO()
+    exit_code = 0
+
+    started = time.perf_counter()
+    with redirect_stdout(output):
+        try:
+            func()
+        except SystemExit as e:
+            exit_code = e.code
+    wall_time = time.perf_counter() - started
+
+    result = {
+        "wall_time": round(wall_time, 3),
+        "api_calls": sum(counter.calls.values()),
+        "peak_memory_mb": round(
+            (tracemalloc.get_traced_memory()[1] - memory_before) / 2**20, 1
+        ),
+        "lines": len(output.getvalue().splitlines()),
+        "exit_code": exit_code,
+        "top_operations": dict(counter.calls.most_common(5)),
+    }
+    return result, output.getvalue()
+
+
+def run_scenarios(scale: dict, threads: int, paced: bool) -> dict[str, dict]:
+    # Imported under the mock so that no real credentials are looked up.
+    from clean_orphaned_resources import clients, rate_limit
+    from clean_orphaned_resources.app import CleanOrphanedResources
+
+    # moto answers at once, so pacing to the real quotas would make wall_time
+    # measure mostly the sleeps of the token buckets.
+    rate_limit.set_enabled(paced)
+
+    # The resource listings log every untagged resource; only errors matter
+    # here. The level is set after the import, which configures logging.
+    logging.getLogger().setLevel(logging.ERROR)
+
+    app = CleanOrphanedResources()
+    counter = ApiCallCounter()
+    clients.get_session().events.register("before-send", counter)
+
+    regions = populate(scale)
+    results = {}
+
+    results["list"], _ = measure(
+        lambda: app.list(region=regions[0], threads=threads), counter
+    )
+    results["list_all"], output = measure(
+        lambda: app.list(all_regions=True, threads=threads), counter
+    )
+
+    sys.stdin = io.StringIO(output)
+    try:
+        results["destroy"], _ = measure(lambda: app.destroy(threads=threads), counter)
+    finally:
+        sys.stdin = sys.__stdin__
+
+    return results
+
+
+def load_baseline() -> dict:
+    try:
+        with open(BASELINE_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict]) -> list[str]:
+    """
+    Print each metric next to its baseline and return the regressions.
+    """
+    regressions = []
+    for scenario, result in results.items():
+        expected = baseline.get(scenario, {})
+        for metric, tolerance in TOLERANCES.items():
+            value = result[metric]
+            if metric not in expected:
+                print(f"{scenario:10} {metric:16} {value:>10}")
+                continue
+
+            previous = expected[metric]
+            change = (value - previous) / previous if previous else 0.0
+            flag = ""
+            if change > tolerance:
+                flag = "  REGRESSION"
+                regressions.append(f"{scenario} {metric}")
+            print(
+                f"{scenario:10} {metric:16} {value:>10} "
+                f"(baseline {previous}, {change:+.0%}){flag}"
+            )
+    return regressions
+
+
+def main(
+    scale: str = "small",
+    threads: int = 16,
+    update_baseline: bool = False,
+    rate_limit: bool = False,
+):
+    """
+    Populate a synthetic account of the given scale (small, medium or large),
+    run list, list -a and destroy against it, and compare the wall time, API
+    call count and peak memory of each with benchmarks/baseline.json.
+
+    API calls are not paced to the real quotas unless --rate-limit is given,
+    whose wall times cannot be compared with the baseline.
+
+    With --update-baseline, the results replace the stored baseline instead.
+    Exits with status 1 if any metric regressed beyond its tolerance.
+    """
+    if scale not in SCALES:
+        raise ValueError(f"Unknown scale: {scale} (choose from {', '.join(SCALES)})")
+
+    for key in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        os.environ.setdefault(key, "testing")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+    tracemalloc.start()
+    with mock_aws():
+        results = run_scenarios(SCALES[scale], threads, rate_limit)
+    tracemalloc.stop()
+
+    baseline = load_baseline()
+    regressions = compare(results, baseline.get(scale, {}))
+
+    if update_baseline:
+        baseline[scale] = results
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Updated the {scale} baseline in {BASELINE_PATH}")
+    elif regressions:
+        print(f"Regressed: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    fire.Fire(main)
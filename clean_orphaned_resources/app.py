@@ -1,135 +1,979 @@
 import logging
+import re
 import sys
 from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor
-
-import fire
-import boto3
-
-from clean_orphaned_resources import resource_types
+from contextlib import ExitStack, nullcontext
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from queue import Queue
+from threading import BoundedSemaphore, Condition, Lock, Thread
+from typing import Iterable, Optional
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+
+import botocore.exceptions
+
+from clean_orphaned_resources import (
+    clients,
+    filters,
+    inventory,
+    profiler,
+    resource_types,
+    snapshot,
+    stack_cache,
+    stats,
+    trace,
+)
+from clean_orphaned_resources.resource_types import tag_index
+from clean_orphaned_resources.journal import Journal, get_resource_key, load_completed
+from clean_orphaned_resources.resource_types.base import get_account_id
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
 
+STATS_FORMATS = ("json", "openmetrics")
+
+TARGET_STACK_STATUSES = [
+    "CREATE_COMPLETE",
+    "UPDATE_COMPLETE",
+    "ROLLBACK_COMPLETE",
+    "UPDATE_ROLLBACK_COMPLETE",
+]
+
 
 def get_default_region() -> str:
-    session = boto3.Session()
+    session = clients.get_session()
     return session.region_name
 
 
+_all_regions_lock = Lock()
+_all_regions = None
+
+
 def get_all_regions() -> list[str]:
-    ec2_client = boto3.client("ec2")
-    regions = ec2_client.describe_regions()
-    region_names = [region["RegionName"] for region in regions["Regions"]]
-    return region_names
+    global _all_regions
+
+    with _all_regions_lock:
+        if _all_regions is None:
+            ec2_client = clients.get_client("ec2")
+            regions = ec2_client.describe_regions()
+            _all_regions = [region["RegionName"] for region in regions["Regions"]]
+        return _all_regions
 
 
-def get_stack_resources(region: str) -> dict[str, dict[str, dict[str, str]]]:
+def list_stacks(region: str, statuses: list[str] = TARGET_STACK_STATUSES) -> list[dict]:
+    cfn_client = clients.get_client("cloudformation", region_name=region)
+    paginator = cfn_client.get_paginator("list_stacks")
+
+    stacks = []
+    for page in paginator.paginate(StackStatusFilter=statuses):
+        stacks.extend(page["StackSummaries"])
+    return stacks
+
+
+def is_stack_not_found_error(e: botocore.exceptions.ClientError) -> bool:
+    error = e.response["Error"]
+    return error["Code"] == "ValidationError" and "does not exist" in error.get(
+        "Message", ""
+    )
+
+
+@trace.traced()
+def list_stack_resources(region: str, stack_id: str) -> Optional[list[dict]]:
     """
-    Return a nested dict like: {"AWS::S3::Bucket": {"SampleBucket": {...}}}
+    Return the resources of the stack, or None if it no longer exists.
     """
-    resources = defaultdict(lambda: defaultdict(dict))
+    cfn_client = clients.get_client("cloudformation", region_name=region)
+    paginator = cfn_client.get_paginator("list_stack_resources")
+
+    stack_resources = []
+    try:
+        for page in paginator.paginate(StackName=stack_id):
+            stack_resources.extend(page["StackResourceSummaries"])
+    except botocore.exceptions.ClientError as e:
+        # The stack may have been deleted since it was listed. Any other error
+        # leaves the resources of the stack unknown, and they must not be
+        # reported as orphans, so the listing of the region fails instead.
+        if not is_stack_not_found_error(e):
+            raise
+        logger.info(f"Stack {stack_id} no longer exists, skipping.")
+        return None
+    return stack_resources
+
+
+def fetch_stack_resources(
+    region: str,
+    stack_ids: list[str],
+    executor: ThreadPoolExecutor,
+    known_stack_resources: dict[str, list[dict]] = None,
+) -> dict[str, list[dict]]:
+    """
+    Fetch the resources of every stack concurrently, following nested stacks
+    that were neither part of the given stack IDs nor already known. Stacks
+    deleted in the meantime are left out.
+    """
+    stack_resources = dict(known_stack_resources or {})
+    seen = set(stack_ids) | set(stack_resources)
+    pending = {
+        executor.submit(list_stack_resources, region, stack_id): stack_id
+        for stack_id in stack_ids
+    }
+
+    def follow_nested_stacks(resources_of_stack: list[dict]) -> None:
+        for stack_resource in resources_of_stack:
+            nested_stack_id = stack_resource.get("PhysicalResourceId")
+            if (
+                stack_resource["ResourceType"] == "AWS::CloudFormation::Stack"
+                and nested_stack_id
+                and nested_stack_id not in seen
+            ):
+                seen.add(nested_stack_id)
+                nested_future = executor.submit(
+                    list_stack_resources, region, nested_stack_id
+                )
+                pending[nested_future] = nested_stack_id
 
-    cfn_client = boto3.client("cloudformation", region_name=region)
-    paginator = cfn_client.get_paginator("list_stacks")
-    target_statuses = [
-        "CREATE_COMPLETE",
-        "UPDATE_COMPLETE",
-        "ROLLBACK_COMPLETE",
-        "UPDATE_ROLLBACK_COMPLETE",
+    for resources_of_stack in list(stack_resources.values()):
+        follow_nested_stacks(resources_of_stack)
+
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            stack_id = pending.pop(future)
+            resources_of_stack = future.result()
+            if resources_of_stack is not None:
+                stack_resources[stack_id] = resources_of_stack
+                follow_nested_stacks(resources_of_stack)
+
+    return stack_resources
+
+
+def fetch_stack_resources_with_cache(
+    region: str, stacks: list[dict], executor: ThreadPoolExecutor, cache_dir: str
+) -> dict[str, list[dict]]:
+    """
+    Fetch only the stacks that are new or changed since the cache for this
+    account and region was written, then rewrite the cache without the
+    stacks that no longer exist. The cache is only written once every stack
+    has been read, so that a failed read is never saved as an empty stack.
+    """
+    cache_path = stack_cache.get_cache_path(cache_dir, get_account_id(), region)
+    cached_stacks = stack_cache.load(cache_path)
+
+    versions = {
+        stack["StackId"]: stack_cache.get_stack_version(stack) for stack in stacks
+    }
+    fresh_stack_resources = {
+        stack_id: cached_stacks[stack_id]["resources"]
+        for stack_id, version in versions.items()
+        if stack_id in cached_stacks and cached_stacks[stack_id]["version"] == version
+    }
+    changed_stack_ids = [
+        stack_id for stack_id in versions if stack_id not in fresh_stack_resources
     ]
+    logger.info(
+        f"{len(changed_stack_ids)} of {len(stacks)} stacks in {region} region "
+        "changed since the last run"
+    )
+
+    stack_resources = fetch_stack_resources(
+        region, changed_stack_ids, executor, fresh_stack_resources
+    )
+
+    stack_cache.save(
+        cache_path,
+        {
+            stack_id: {
+                "version": version,
+                "resources": [
+                    stack_cache.slim_stack_resource(stack_resource)
+                    for stack_resource in stack_resources[stack_id]
+                ],
+            }
+            for stack_id, version in versions.items()
+            if stack_id in stack_resources
+        },
+    )
+    return stack_resources
+
+
+def add_stack_resource(resources: dict, stack_resource: dict) -> None:
+    if "PhysicalResourceId" in stack_resource:
+        resources[stack_resource["ResourceType"]][
+            stack_resource["PhysicalResourceId"]
+        ] = {"resource_status": stack_resource["ResourceStatus"]}
+
+        # Ensure Lambda does not delete LogGroup
+        if stack_resource["ResourceType"] == "AWS::Lambda::Function":
+            resource_id = f'/aws/lambda/{stack_resource["PhysicalResourceId"]}'
+            resources["AWS::Logs::LogGroup"][resource_id] = {
+                "resource_status": stack_resource["ResourceStatus"]
+            }
+
+
+@trace.traced()
+def get_stack_resources(
+    region: str, executor: ThreadPoolExecutor = None, cache_dir: str = None
+) -> dict[str, dict[str, dict[str, str]]]:
+    """
+    Return a nested dict like: {"AWS::S3::Bucket": {"SampleBucket": {...}}}
+    """
+    resources = defaultdict(lambda: defaultdict(dict))
+    stacks = list_stacks(region)
 
-    for page in paginator.paginate():
-        for stack in page["StackSummaries"]:
-            if stack["StackStatus"] in target_statuses:
-                stack_name = stack["StackName"]
-                stack_resources = cfn_client.describe_stack_resources(
-                    StackName=stack_name
-                )
+    with ExitStack() as exit_stack:
+        if executor is None:
+            executor = exit_stack.enter_context(ThreadPoolExecutor())
 
-                for stack_resource in stack_resources["StackResources"]:
-                    if "PhysicalResourceId" in stack_resource:
-                        resources[stack_resource["ResourceType"]][
-                            stack_resource["PhysicalResourceId"]
-                        ] = {"resource_status": stack_resource["ResourceStatus"]}
+        if cache_dir:
+            stack_resources = fetch_stack_resources_with_cache(
+                region, stacks, executor, cache_dir
+            )
+        else:
+            stack_ids = [stack["StackId"] for stack in stacks]
+            stack_resources = fetch_stack_resources(region, stack_ids, executor)
 
-                        # Ensure Lambda does not delete LogGroup
-                        if stack_resource["ResourceType"] == "AWS::Lambda::Function":
-                            resource_id = (
-                                f'/aws/lambda/{stack_resource["PhysicalResourceId"]}'
-                            )
-                            resources["AWS::Logs::LogGroup"][resource_id] = {
-                                "resource_status": stack_resource["ResourceStatus"]
-                            }
+    for resources_of_stack in stack_resources.values():
+        for stack_resource in resources_of_stack:
+            add_stack_resource(resources, stack_resource)
     return resources
 
 
 def print_orphaned_resource(
-    region: str, resource_type: str, resource_name: str, tags: str
+    region: str,
+    resource_type: str,
+    resource_name: str,
+    tags: dict[str, str],
+    details: str = "",
+    output_format: str = "csv",
 ) -> None:
-    print(f"{region},{resource_type},{resource_name},{tags}")
+    print(
+        inventory.format_line(
+            region, resource_type, resource_name, tags, details, output_format
+        )
+    )
 
 
-def parse_orphaned_resource(text: str) -> (str, str, str, str):
-    if "#" in text:
-        text = text.split("#", 1)[0]
+class OrphanedResourceWriter:
+    """
+    Print orphaned resources from a single thread, in the order in which the
+    listing threads confirm them, so that lines never interleave. With
+    details_threads, each resource is first described on a pool of that size
+    and its details are appended as a comment.
 
-    parts = text.split(",")
-    region = parts[0]
-    resource_type = parts[1]
-    resource_name = parts[2]
+    Resources gone since the previous snapshot are printed as comment lines
+    starting with '#removed', which 'destroy' ignores.
+    """
 
-    tags = ""
-    if len(parts) > 3:
-        tags = parts[3]
+    def __init__(self, details_threads: int = 0, output_format: str = "csv"):
+        self._output_format = output_format
+        self._queue = Queue()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._details_executor = None
+        if details_threads:
+            self._details_executor = ThreadPoolExecutor(max_workers=details_threads)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._details_executor:
+            self._details_executor.shutdown()
+        self._queue.put(None)
+        self._thread.join()
+
+    def write(
+        self,
+        region: str,
+        resource_type: str,
+        resource_name: str,
+        tags: dict[str, str],
+    ) -> None:
+        if self._details_executor is None:
+            self._queue.put((region, resource_type, resource_name, tags, ""))
+            return
+
+        future = self._details_executor.submit(
+            resource_types.classes[resource_type].describe_resource,
+            region,
+            resource_name,
+        )
+        future.add_done_callback(
+            partial(self._write_details, region, resource_type, resource_name, tags)
+        )
+
+    def write_removed(
+        self,
+        region: str,
+        resource_type: str,
+        resource_name: str,
+        tags: dict[str, str],
+    ) -> None:
+        line = inventory.format_line(
+            region,
+            resource_type,
+            resource_name,
+            tags,
+            output_format=self._output_format,
+        )
+        self._queue.put(f"#removed {line}")
+
+    def _write_details(
+        self,
+        region: str,
+        resource_type: str,
+        resource_name: str,
+        tags: dict[str, str],
+        future: Future,
+    ) -> None:
+        try:
+            details = future.result()
+        except Exception as e:
+            logger.warning(f"Failed to describe {resource_name} ({resource_type}): {e}")
+            details = ""
+        self._queue.put((region, resource_type, resource_name, tags, details))
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            if isinstance(item, str):
+                print(item)
+            else:
+                print_orphaned_resource(*item, self._output_format)
+            # Flush once the backlog is drained so that downstream pipes see
+            # each line promptly without a write per line under load.
+            if self._queue.empty():
+                sys.stdout.flush()
+
+
+def parse_orphaned_resource(text: str) -> tuple[str, str, str, dict[str, str]]:
+    return inventory.parse_line(text)
+
+
+def write_orphaned_resources(
+    region: str,
+    resource_type: type,
+    identifiers: list[tuple[str, dict[str, str]]],
+    stack_resources: dict,
+    writer: OrphanedResourceWriter,
+) -> None:
+    for name, tags in identifiers:
+        if name in stack_resources[resource_type.RESOURCE_TYPE]:
+            continue
+        if filters.match(name, tags):
+            writer.write(region, resource_type.RESOURCE_TYPE, name, tags)
+
+
+@trace.traced()
+def list_orphaned_resources_of_type(
+    region: str,
+    resource_type: type,
+    stack_future: Future,
+    writer: OrphanedResourceWriter,
+) -> None:
+    """
+    Stream the resources of one type to the writer as they are listed. Until
+    the CloudFormation inventory of the region is ready, they are held back.
+    """
+    recorder = None
+    if snapshot.is_enabled():
+        writer = recorder = snapshot.SnapshotRecorder(
+            writer, region, resource_type.RESOURCE_TYPE
+        )
+
+    buffered = []
+    for identifier in resource_type.list_resource_identifiers(region):
+        buffered.append(identifier)
+        if recorder:
+            recorder.add_listed(*identifier)
+        if stack_future.done():
+            write_orphaned_resources(
+                region, resource_type, buffered, stack_future.result(), writer
+            )
+            buffered = []
+
+    write_orphaned_resources(
+        region, resource_type, buffered, stack_future.result(), writer
+    )
+    if recorder:
+        recorder.finish()
+
+
+@trace.traced()
+def list_orphaned_resources(
+    regions: list[str],
+    threads: int,
+    cache_dir: str = None,
+    details: bool = False,
+    output_format: str = "csv",
+) -> int:
+    """
+    Run the CloudFormation inventory of every region and the listing of every
+    (region, resource type) pair as independent work units on one pool. The
+    per-stack resource fetches share a second pool, so that inventory units
+    never wait on work queued behind themselves. The inventory units are
+    submitted first, so the listing units that wait on them never block them.
 
-    return region, resource_type, resource_name, tags
+    Return the number of units that failed.
+    """
+    failed_units = 0
+    with OrphanedResourceWriter(threads if details else 0, output_format) as writer:
+        with ThreadPoolExecutor(max_workers=threads) as stack_executor:
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                stack_futures = {}
+                for region in regions:
+                    logger.info(f"Fetching resources in {region} region...")
+                    stack_futures[region] = executor.submit(
+                        get_stack_resources, region, stack_executor, cache_dir
+                    )
+
+                unit_futures = {}
+                for region in regions:
+                    for resource_type in filters.get_resource_types():
+                        future = executor.submit(
+                            list_orphaned_resources_of_type,
+                            region,
+                            resource_type,
+                            stack_futures[region],
+                            writer,
+                        )
+                        unit_futures[future] = (region, resource_type)
+
+                for future in as_completed(unit_futures):
+                    region, resource_type = unit_futures[future]
+                    try:
+                        future.result()
+                    except Exception as e:
+                        failed_units += 1
+                        logger.error(
+                            f"Failed to list {resource_type.RESOURCE_TYPE} "
+                            f"in {region}: {e}"
+                        )
+
+    return failed_units
+
+
+def parse_since(since: str) -> datetime:
+    """
+    Parse an ISO 8601 time, in UTC unless it has an offset, or a duration
+    back from now such as "30m", "24h" or "7d".
+    """
+    match = re.fullmatch(r"(\d+)([mhd])", str(since).strip())
+    if match:
+        amount, unit = match.groups()
+        unit_name = {"m": "minutes", "h": "hours", "d": "days"}[unit]
+        return datetime.now(timezone.utc) - timedelta(**{unit_name: int(amount)})
+
+    parsed = datetime.fromisoformat(str(since))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def list_deleted_stacks(region: str, since: datetime) -> list[dict]:
+    def deleted_at(stack: dict) -> datetime:
+        # Fall back to the last known time of summaries without DeletionTime.
+        return (
+            stack.get("DeletionTime")
+            or stack.get("LastUpdatedTime")
+            or stack["CreationTime"]
+        )
+
+    return [
+        stack
+        for stack in list_stacks(region, ["DELETE_COMPLETE"])
+        if deleted_at(stack) >= since
+    ]
 
 
-def list_orphaned_resources(region: str) -> None:
-    logger.info(f"Fetching resources in {region} region...")
-    stack_resources = get_stack_resources(region)
+@trace.traced()
+def list_retained_resources_in_region(
+    region: str,
+    since: datetime,
+    stack_executor: ThreadPoolExecutor,
+    check_executor: ThreadPoolExecutor,
+    cache_dir: str,
+    writer: OrphanedResourceWriter,
+) -> int:
+    """
+    Check only the resources recorded by stacks deleted since the given time,
+    such as those kept by a RETAIN removal policy, skipping any that a live
+    stack now owns. Return the number of resources that could not be checked.
+    """
+    deleted_stacks = list_deleted_stacks(region, since)
+    logger.info(f"Found {len(deleted_stacks)} deleted stacks in {region} region")
+    if not deleted_stacks:
+        return 0
+
+    # Deleted stacks can only be read by their stack ID.
+    deleted_stack_resources = defaultdict(lambda: defaultdict(dict))
+    stack_ids = [stack["StackId"] for stack in deleted_stacks]
+    for resources_of_stack in fetch_stack_resources(
+        region, stack_ids, stack_executor
+    ).values():
+        for stack_resource in resources_of_stack:
+            add_stack_resource(deleted_stack_resources, stack_resource)
+
+    live_stack_resources = get_stack_resources(region, stack_executor, cache_dir)
+
+    futures = {}
+    for resource_type_name, identifiers in deleted_stack_resources.items():
+        resource_type = resource_types.classes.get(resource_type_name)
+        if resource_type is None or not filters.is_selected(resource_type_name):
+            continue
+
+        for identifier in identifiers:
+            if identifier in live_stack_resources[resource_type_name]:
+                continue
+            if filters.match_name(identifier):
+                future = check_executor.submit(
+                    resource_type.get_resource, region, identifier
+                )
+                futures[future] = (resource_type_name, identifier)
+
+    failed = 0
+    for future in as_completed(futures):
+        resource_type_name, identifier = futures[future]
+        try:
+            tags = future.result()
+        except Exception as e:
+            failed += 1
+            logger.error(
+                f"Failed to check {identifier} ({resource_type_name}) in {region}: {e}"
+            )
+            continue
+
+        if tags is not None and filters.match_tags(tags):
+            writer.write(region, resource_type_name, identifier, tags)
+
+    return failed
+
+
+@trace.traced()
+def list_retained_resources(
+    regions: list[str],
+    since: datetime,
+    threads: int,
+    cache_dir: str = None,
+    details: bool = False,
+    output_format: str = "csv",
+) -> int:
+    """
+    Run list_retained_resources_in_region for every region on one pool, with
+    the stack reads and the resource checks on pools of their own.
 
-    for resource_type in resource_types.classes.values():
-        for name, tags in resource_type.list_resource_identifiers(region):
-            if name not in stack_resources[resource_type.RESOURCE_TYPE]:
-                print_orphaned_resource(region, resource_type.RESOURCE_TYPE, name, tags)
+    Return the number of regions and resources that failed.
+    """
+    failed = 0
+    with OrphanedResourceWriter(threads if details else 0, output_format) as writer:
+        with ThreadPoolExecutor(max_workers=threads) as stack_executor:
+            with ThreadPoolExecutor(max_workers=threads) as check_executor:
+                with ThreadPoolExecutor(max_workers=threads) as executor:
+                    region_futures = {
+                        executor.submit(
+                            list_retained_resources_in_region,
+                            region,
+                            since,
+                            stack_executor,
+                            check_executor,
+                            cache_dir,
+                            writer,
+                        ): region
+                        for region in regions
+                    }
+
+                    for future in as_completed(region_futures):
+                        try:
+                            failed += future.result()
+                        except Exception as e:
+                            failed += 1
+                            logger.error(
+                                f"Failed to check deleted stacks in "
+                                f"{region_futures[future]}: {e}"
+                            )
+
+    return failed
 
 
-def destroy_orphaned_resources(line: str) -> None:
+@trace.traced()
+def destroy_orphaned_resources(line: str) -> Optional[Future]:
     region, resource_type, resource_name, tags = parse_orphaned_resource(line)
+    if resource_type not in resource_types.classes:
+        raise ValueError(f"Unsupported resource type: {resource_type}")
+
     logger.info(f"Deleting {resource_name} ({resource_type})...")
-    resource_types.classes[resource_type].delete_resource(region, resource_name)
+    return resource_types.classes[resource_type].delete_resource(region, resource_name)
+
+
+def is_orphaned_resource_line(line: str) -> bool:
+    return inventory.is_resource_line(line)
+
+
+class DestroySummary:
+    """
+    Collect the outcome of each destroyed line. Only failures are kept, so
+    memory does not grow with the number of lines. With a journal, every
+    outcome is also appended to it.
+    """
+
+    def __init__(self, destroy_journal: Journal = None):
+        self.deleted = 0
+        self.skipped = 0
+        self.failed_lines = []
+        self._journal = destroy_journal
+        self._lock = Lock()
+        self._pending = 0
+        self._done = Condition(self._lock)
+
+    def record(self, line_number: int, line: str, future: Future) -> None:
+        try:
+            result = future.result()
+        except botocore.exceptions.ClientError as e:
+            logger.warning(f"Line {line_number}: {e}")
+            error = str(e)
+        except Exception as e:
+            logger.error(f"Line {line_number}: {e}")
+            error = str(e) or type(e).__name__
+        else:
+            error = None
+            if isinstance(result, Future):
+                # The deletion goes on in the background, e.g. a file system
+                # waiting for its mount targets; its outcome is recorded later.
+                with self._lock:
+                    self._pending += 1
+                result.add_done_callback(
+                    partial(self._record_pending, line_number, line)
+                )
+                return
+
+        with self._lock:
+            if error:
+                self.failed_lines.append((line_number, line.rstrip("\n")))
+            else:
+                self.deleted += 1
+
+        if self._journal:
+            self._journal.write(line_number, line, error)
+
+    def _record_pending(self, line_number: int, line: str, future: Future) -> None:
+        self.record(line_number, line, future)
+        with self._lock:
+            self._pending -= 1
+            self._done.notify_all()
+
+    def wait(self) -> None:
+        """
+        Wait for the deletions that went on in the background.
+        """
+        with self._lock:
+            if self._pending:
+                logger.info(f"Waiting for {self._pending} pending deletions...")
+            self._done.wait_for(lambda: self._pending == 0)
+
+    def log(self) -> None:
+        if self.skipped:
+            logger.info(f"Skipped {self.skipped} resources deleted by a previous run")
+        logger.info(
+            f"Deleted {self.deleted} resources, failed to delete "
+            f"{len(self.failed_lines)}"
+        )
+        for line_number, line in sorted(self.failed_lines):
+            logger.warning(f"Not deleted (line {line_number}): {line}")
+
+
+def destroy_orphaned_resources_from(
+    lines: Iterable[str],
+    threads: int,
+    destroy_journal: Journal = None,
+    completed: set[tuple[str, str, str]] = frozenset(),
+) -> DestroySummary:
+    """
+    Delete the resources of each line as soon as it is read. At most twice as
+    many lines as there are threads are in flight at once; reading waits for
+    one of them to finish. Resources in completed are skipped.
+    """
+    summary = DestroySummary(destroy_journal)
+    in_flight = BoundedSemaphore(threads * 2)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for line_number, line in enumerate(lines, start=1):
+            if not is_orphaned_resource_line(line):
+                continue
+            if completed and get_resource_key(line) in completed:
+                summary.skipped += 1
+                continue
+
+            in_flight.acquire()
+            future = executor.submit(destroy_orphaned_resources, line)
+            future.add_done_callback(lambda f: in_flight.release())
+            future.add_done_callback(partial(summary.record, line_number, line))
+
+    summary.wait()
+    return summary
+
+
+def open_journal(path: str):
+    """
+    Return a context manager for the journal at path, or for nothing if no
+    journal was requested.
+    """
+    if path is None:
+        return nullcontext()
+    return Journal(path)
+
+
+def start_stats(log: bool, path: str, stats_format: str) -> None:
+    if stats_format not in STATS_FORMATS:
+        raise ValueError(
+            f"Unknown stats format: {stats_format} "
+            f"(choose from {', '.join(STATS_FORMATS)})"
+        )
+    if log or path:
+        stats.enable()
+
+
+def report_stats(log: bool, path: str, stats_format: str) -> None:
+    if log:
+        stats.log_summary()
+    if path:
+        stats.write_report(path, stats_format)
+        logger.info(f"Wrote API call statistics to {path}")
+
+
+def start_tracing(trace_file: str, profile: bool, profile_file: str) -> None:
+    if trace_file:
+        trace.enable()
+    if profile or profile_file:
+        profiler.start()
+
+
+def finish_tracing(trace_file: str, profile: bool, profile_file: str) -> None:
+    if profile or profile_file:
+        profiler.stop(profile_file)
+    if trace_file:
+        trace.write(trace_file)
 
 
 class CleanOrphanedResources:
-    def list(self, region: str = None, all_regions: bool = False, threads: int = 16):
+    def list(
+        self,
+        region: str = None,
+        all_regions: bool = False,
+        threads: int = 16,
+        cache: bool = False,
+        cache_dir: str = None,
+        bulk_tags: bool = False,
+        shard_log_groups: bool = False,
+        details: bool = False,
+        stats: bool = False,
+        stats_file: str = None,
+        stats_format: str = "json",
+        trace: str = None,
+        profile: bool = False,
+        profile_file: str = None,
+        deleted_since: str = None,
+        since_snapshot: bool = False,
+        format: str = "csv",
+        types: str = None,
+        name_prefix: str = None,
+        exclude_pattern: str = None,
+        tag_filter: str = None,
+    ):
         """
         Lists the candidate resources to be deleted after an AWS CDK 'destroy' operation.
 
+        With --cache, the resources of each CloudFormation stack are kept on disk
+        (in --cache-dir, ~/.cache/clean-orphaned-resources by default) and only
+        stacks that changed since the previous run are read again.
+
+        With --bulk-tags, the tags of each region are read in one scan of the
+        Resource Groups Tagging API instead of one call per resource.
+
+        With --shard-log-groups, log groups are listed by name prefix shards that
+        are paged concurrently and split as they grow, which is faster for tens
+        of thousands of groups.
+
+        With --details, resource details such as the size, item count and billing
+        mode of DynamoDB tables are appended to each line after a '#'.
+
+        With --deleted-since (e.g. 24h, 7d or 2024-05-01T00:00:00), only the
+        resources recorded by stacks deleted since then are checked, which takes
+        seconds after a 'cdk destroy' instead of a scan of the whole account.
+
+        With --since-snapshot, only the orphaned resources that are new since the
+        previous --since-snapshot run are printed, followed by those gone since as
+        '#removed' comment lines. Each (region, resource type) inventory is saved
+        as a snapshot under --cache-dir, and log groups that the snapshot already
+        had are not asked for their tags again until those tags are a day old.
+
+        With --format jsonl, each resource is printed as a JSON object with its
+        tags as a map, so that names and tags containing ',' or '#' round-trip
+        through 'destroy' intact. The default is --format csv.
+
+        --types (e.g. AWS::Logs::LogGroup,AWS::S3::Bucket) lists only the given
+        resource types. --name-prefix and --exclude-pattern (a regular expression)
+        keep only the resources whose names match, and --tag-filter (e.g.
+        env=dev,team) only those with every tag key, and one of the values if
+        given. Names are filtered before tags are read, log groups and buckets
+        are listed by prefix, and tag filters are passed to the Resource Groups
+        Tagging API.
+
+        With --stats, the calls, latency, retries and throttles of each API
+        operation are logged at the end. --stats-file writes them to a file as
+        JSON, or as OpenMetrics text with --stats-format openmetrics.
+
+        With --trace FILE, the inventory, listing, tag and deletion phases of each
+        region and resource type are written to FILE as a timeline that Perfetto
+        (https://ui.perfetto.dev) can open. With --profile, the run is profiled
+        with cProfile across all threads and the slowest functions are printed;
+        --profile-file also saves the profile.
+
+        Exits with status 1 if any region or resource type could not be listed.
+
         Usage: clean-orphaned-resources list
         """
+        if format not in inventory.FORMATS:
+            raise ValueError(
+                f"Unknown format: {format} (choose from {', '.join(inventory.FORMATS)})"
+            )
+        if deleted_since and since_snapshot:
+            raise ValueError("--deleted-since cannot be combined with --since-snapshot")
+        filters.enable(types, name_prefix, exclude_pattern, tag_filter)
+        if since_snapshot and filters.has_resource_filters():
+            raise ValueError(
+                "--since-snapshot cannot be combined with "
+                "--name-prefix, --exclude-pattern or --tag-filter"
+            )
+        clients.configure(threads)
+        start_stats(stats, stats_file, stats_format)
+        start_tracing(trace, profile, profile_file)
+
+        from clean_orphaned_resources.resource_types import (
+            cloudwatch_log_group,
+            kms_key,
+            s3_bucket,
+        )
+
+        s3_bucket.reset_bucket_regions()
+        kms_key.reset_key_metadata()
+
+        # The options are module state, so a run must also turn off what an
+        # earlier run in the same process turned on.
+        if bulk_tags or tag_filter:
+            tag_index.enable(
+                [
+                    resource_type.TAGGING_RESOURCE_TYPE
+                    for resource_type in filters.get_resource_types()
+                ],
+                filters.get_tag_filters(),
+            )
+        else:
+            tag_index.disable()
+
+        cloudwatch_log_group.enable_sharded_listing(bool(shard_log_groups))
+
+        if since_snapshot:
+            snapshot.enable(
+                cache_dir or stack_cache.get_default_cache_dir(), get_account_id()
+            )
+        else:
+            snapshot.disable()
+
+        if cache:
+            cache_dir = cache_dir or stack_cache.get_default_cache_dir()
+        else:
+            cache_dir = None
+
         if all_regions:
             regions = get_all_regions()
-            with ThreadPoolExecutor(max_workers=threads) as executor:
-                executor.map(list_orphaned_resources, regions)
         else:
-            if not region:
-                region = get_default_region()
-            list_orphaned_resources(region)
-
-    def destroy(self, threads: int = 16):
+            regions = [region or get_default_region()]
+
+        if deleted_since:
+            failed_units = list_retained_resources(
+                regions,
+                parse_since(deleted_since),
+                threads,
+                cache_dir,
+                details,
+                format,
+            )
+        else:
+            failed_units = list_orphaned_resources(
+                regions, threads, cache_dir, details, format
+            )
+        report_stats(stats, stats_file, stats_format)
+        finish_tracing(trace, profile, profile_file)
+
+        if failed_units:
+            sys.exit(1)
+
+    def destroy(
+        self,
+        threads: int = 16,
+        stats: bool = False,
+        stats_file: str = None,
+        stats_format: str = "json",
+        trace: str = None,
+        profile: bool = False,
+        profile_file: str = None,
+        journal: str = None,
+        resume: bool = False,
+    ):
         """
         Deletes the candidate resources after they are passed through standard input.
 
+        Lines are processed as they are read, so the output of a running 'list'
+        can be piped in directly. Both the CSV and the JSON Lines output of 'list'
+        are accepted. Exits with status 1 if any deletion failed.
+
+        With --journal FILE, the outcome of each line is appended to FILE. With
+        --resume as well, resources that FILE records as deleted are skipped, so
+        an interrupted run can be restarted with the same input.
+
+        --stats, --stats-file and --stats-format report the API calls, and --trace,
+        --profile and --profile-file record the run, as for 'list'.
+
         Usage: clean-orphaned-resources destroy
         """
-        lines = sys.stdin.readlines()
-        with ThreadPoolExecutor(max_workers=threads) as executor:
-            executor.map(destroy_orphaned_resources, lines)
+        if resume and not journal:
+            raise ValueError("--resume requires --journal")
+        # Check the current tags of each resource, not those indexed by an
+        # earlier 'list' in the same process.
+        tag_index.disable()
+        from clean_orphaned_resources.resource_types import kms_key
+
+        # Nor the key states described by an earlier run.
+        kms_key.reset_key_metadata()
+        start_stats(stats, stats_file, stats_format)
+        start_tracing(trace, profile, profile_file)
+
+        completed = load_completed(journal) if resume else frozenset()
+        with open_journal(journal) as destroy_journal:
+            clients.configure(threads)
+            summary = destroy_orphaned_resources_from(
+                sys.stdin, threads, destroy_journal, completed
+            )
+        summary.log()
+        report_stats(stats, stats_file, stats_format)
+        finish_tracing(trace, profile, profile_file)
+
+        if summary.failed_lines:
+            sys.exit(1)
 
 
 def main():
+    import fire
+
     fire.Fire(CleanOrphanedResources)
 
 
@@ -0,0 +1,96 @@
+from logging import getLogger
+from threading import BoundedSemaphore, Lock
+
+from clean_orphaned_resources import rate_limit, stats
+
+
+logger = getLogger(__name__)
+
+_lock = Lock()
+_session = None
+_clients = {}
+_max_pool_connections = 16
+# Resource types purge and list on pools of their own inside the worker
+# threads, so every request sent holds one of these slots. Each client then
+# never needs more connections than there are slots.
+_request_slots = BoundedSemaphore(_max_pool_connections)
+
+# Throttled requests are retried by botocore with backoff, while
+# rate_limit paces every attempt to what the API allows.
+RETRY_CONFIG = {"mode": "standard", "max_attempts": 10}
+
+
+def configure(threads: int) -> None:
+    """
+    Allow as many requests in flight at once as there are worker threads, and
+    size the connection pool of every client to match. Call it while no
+    request is in flight.
+    """
+    global _max_pool_connections, _request_slots
+
+    with _lock:
+        if threads != _max_pool_connections:
+            _max_pool_connections = threads
+            _request_slots = BoundedSemaphore(threads)
+            _clients.clear()
+
+
+def _acquire_request_slot(**kwargs) -> None:
+    _request_slots.acquire()
+
+
+def _release_request_slot(**kwargs) -> None:
+    _request_slots.release()
+
+
+def get_session():
+    """
+    Return the session that all clients are created from. boto3 takes longer
+    to import than the rest of the tool, so it is only imported here, once a
+    client is first needed.
+    """
+    global _session
+
+    with _lock:
+        if _session is None:
+            import boto3
+
+            _session = boto3.Session()
+        return _session
+
+
+def get_client(service_name: str, region_name: str = None):
+    """
+    Return a client shared by all threads for the (service, region) pair.
+
+    boto3 sessions are not thread-safe, but the clients they create are, so
+    clients are created under a lock from a single session and then reused,
+    keeping their connection pools alive across calls.
+    """
+    key = (service_name, region_name)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    session = get_session()
+    from botocore.config import Config
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = session.client(
+                service_name,
+                region_name=region_name,
+                config=Config(
+                    max_pool_connections=_max_pool_connections,
+                    retries=RETRY_CONFIG,
+                ),
+            )
+            # Requests wait for their rate before they take a slot, and
+            # response-received follows every attempt, even a failed one.
+            rate_limit.register(client)
+            client.meta.events.register("before-send", _acquire_request_slot)
+            client.meta.events.register("response-received", _release_request_slot)
+            stats.register(client)
+            _clients[key] = client
+        return client
@@ -0,0 +1,123 @@
+import re
+from typing import Iterable, Optional, Union
+
+from clean_orphaned_resources import resource_types
+from clean_orphaned_resources.resource_types import tag_index
+
+_resource_type_names = None
+_name_prefix = None
+_exclude_pattern = None
+_tag_filters = None
+
+
+def parse_list(value: Union[str, Iterable[str]]) -> list[str]:
+    """
+    Split a comma-separated option. fire passes "a,b" either as a string or,
+    when it parses as a Python literal, as a tuple.
+    """
+    if isinstance(value, str):
+        value = value.split(",")
+    return [item.strip() for item in value if item.strip()]
+
+
+def parse_tag_filters(value: Union[str, Iterable[str]]) -> dict[str, set[str]]:
+    """
+    Parse filters like "env=dev,env=test,team" into {"env": {"dev", "test"},
+    "team": set()}. As in the Tagging API, a resource must have every key,
+    with one of its values if any are given.
+    """
+    tag_filters = {}
+    for item in parse_list(value):
+        key, has_value, tag_value = item.partition("=")
+        values = tag_filters.setdefault(key, set())
+        if has_value:
+            values.add(tag_value)
+    return tag_filters
+
+
+def enable(
+    types: Union[str, Iterable[str]] = None,
+    name_prefix: str = None,
+    exclude_pattern: str = None,
+    tag_filter: Union[str, Iterable[str]] = None,
+) -> None:
+    """
+    Restrict the listing to the given resource types (e.g.
+    "AWS::Logs::LogGroup"), to names that start with name_prefix and do not
+    match the exclude_pattern regular expression, and to resources whose
+    tags match tag_filter.
+    """
+    global _resource_type_names, _name_prefix, _exclude_pattern, _tag_filters
+
+    _resource_type_names = None
+    if types:
+        _resource_type_names = parse_list(types)
+        for name in _resource_type_names:
+            if name not in resource_types.classes:
+                raise ValueError(
+                    f"Unknown resource type: {name} "
+                    f"(choose from {', '.join(resource_types.classes)})"
+                )
+
+    _name_prefix = name_prefix or None
+    _exclude_pattern = re.compile(exclude_pattern) if exclude_pattern else None
+    _tag_filters = parse_tag_filters(tag_filter) if tag_filter else None
+
+
+def get_resource_types() -> list[type]:
+    """
+    Return the classes of the selected resource types. Only their modules are
+    imported.
+    """
+    if _resource_type_names is None:
+        return list(resource_types.classes.values())
+    return [resource_types.classes[name] for name in _resource_type_names]
+
+
+def is_selected(resource_type: str) -> bool:
+    return _resource_type_names is None or resource_type in _resource_type_names
+
+
+def get_name_prefix() -> Optional[str]:
+    return _name_prefix
+
+
+def get_tag_filters() -> Optional[dict[str, set[str]]]:
+    return _tag_filters
+
+
+def has_resource_filters() -> bool:
+    return bool(_name_prefix or _exclude_pattern or _tag_filters)
+
+
+def match_name(name: str) -> bool:
+    """
+    Return whether the name passes --name-prefix and --exclude-pattern.
+    """
+    if _name_prefix and not name.startswith(_name_prefix):
+        return False
+    return not (_exclude_pattern and _exclude_pattern.search(name))
+
+
+def match_tags(tags: dict[str, str]) -> bool:
+    if not _tag_filters:
+        return True
+    return all(
+        key in tags and (not values or tags[key] in values)
+        for key, values in _tag_filters.items()
+    )
+
+
+def match(name: str, tags: dict[str, str]) -> bool:
+    return match_name(name) and match_tags(tags)
+
+
+def is_candidate(region: str, name: str, arn: str = None) -> bool:
+    """
+    Return whether a listed resource may match the filters, judging from its
+    name and, with --tag-filter, from the filtered scan of the Tagging API.
+    Types call this before they read the tags of a resource one by one.
+    """
+    if not match_name(name):
+        return False
+    return not (arn and tag_index.is_excluded(region, arn))
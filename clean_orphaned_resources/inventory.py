@@ -0,0 +1,84 @@
+import json
+
+# Version of the JSON Lines records. Readers reject records of other versions
+# rather than guessing at their fields.
+INVENTORY_VERSION = 1
+
+FORMATS = ("csv", "jsonl")
+
+
+def format_tags(tags: dict[str, str]) -> str:
+    return ",".join([f"{key}={value}" for key, value in tags.items()])
+
+
+def parse_tags(text: str) -> dict[str, str]:
+    """
+    Parse the tags of a CSV line. Keys or values that contain ',' or '=' do
+    not survive the CSV format; use JSON Lines to keep them intact.
+    """
+    tags = {}
+    for pair in text.split(","):
+        if pair:
+            key, _, value = pair.partition("=")
+            tags[key] = value
+    return tags
+
+
+def format_line(
+    region: str,
+    resource_type: str,
+    resource_name: str,
+    tags: dict[str, str],
+    details: str = "",
+    output_format: str = "csv",
+) -> str:
+    if output_format == "jsonl":
+        record = {
+            "version": INVENTORY_VERSION,
+            "region": region,
+            "type": resource_type,
+            "name": resource_name,
+            "tags": tags,
+        }
+        if details:
+            record["details"] = details
+        return json.dumps(record, separators=(",", ":"))
+
+    line = f"{region},{resource_type},{resource_name},{format_tags(tags)}"
+    if details:
+        line += f"#{details}"
+    return line
+
+
+def parse_line(text: str) -> tuple[str, str, str, dict[str, str]]:
+    """
+    Return (region, resource type, name, tags) of a line in either format.
+    JSON Lines records are recognized by their leading '{', so a file may
+    mix both formats.
+    """
+    if text.lstrip().startswith("{"):
+        record = json.loads(text)
+        if record.get("version") != INVENTORY_VERSION:
+            raise ValueError(f"Unsupported inventory version: {record.get('version')}")
+        missing = [key for key in ("region", "type", "name") if key not in record]
+        if missing:
+            raise ValueError(
+                f"Missing fields in inventory record: {', '.join(missing)}"
+            )
+        return record["region"], record["type"], record["name"], record.get("tags", {})
+
+    if "#" in text:
+        text = text.split("#", 1)[0]
+
+    fields = text.rstrip("\n").split(",")
+    missing = ["region", "type", "name"][len(fields) :]
+    if missing:
+        raise ValueError(f"Missing fields in inventory line: {', '.join(missing)}")
+    region, resource_type, resource_name, *tags = fields
+    return region, resource_type, resource_name, parse_tags(",".join(tags))
+
+
+def is_resource_line(text: str) -> bool:
+    if text.lstrip().startswith("{"):
+        return True
+    return bool(text.split("#", 1)[0].strip())
@@ -0,0 +1,103 @@
+import json
+import os
+from logging import getLogger
+from queue import Queue
+from threading import Thread
+
+from clean_orphaned_resources import inventory
+
+
+logger = getLogger(__name__)
+
+
+def get_resource_key(line: str) -> tuple[str, str, str]:
+    """
+    Return (region, resource type, name) of the line, or None if it cannot
+    be parsed. Outcomes are keyed by resource rather than by line number, so
+    that a resumed run may read a reordered or regenerated file.
+    """
+    try:
+        region, resource_type, resource_name, tags = inventory.parse_line(line)
+    except ValueError:
+        return None
+    return region, resource_type, resource_name
+
+
+def load_completed(path: str) -> set[tuple[str, str, str]]:
+    """
+    Return the resources that a journal records as deleted. A record cut
+    short by an interruption is ignored.
+    """
+    completed = set()
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("status") == "deleted" and record.get("key"):
+                    completed.add(tuple(record["key"]))
+    except FileNotFoundError:
+        pass
+
+    logger.info(f"Resuming: {len(completed)} resources already deleted per {path}")
+    return completed
+
+
+def ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+class Journal:
+    """
+    Append one record per destroyed line from a single thread. Records are
+    written as they come and synced to disk once the backlog is drained, so
+    that a burst of outcomes costs one fsync.
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, "a")
+        # A record cut short by an interruption has no newline. Start on a new
+        # line so that the first record of this run is not appended to it.
+        if self._file.tell() and not ends_with_newline(path):
+            self._file.write("\n")
+        self._queue = Queue()
+        self._thread = Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+
+    def write(self, line_number: int, line: str, error: str = None) -> None:
+        record = {
+            "key": get_resource_key(line),
+            "line": line_number,
+            "status": "failed" if error else "deleted",
+        }
+        if error:
+            record["error"] = error
+        self._queue.put(record)
+
+    def _run(self) -> None:
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+
+            self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+            if self._queue.empty():
+                self._sync()
+
+        self._sync()
+
+    def _sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
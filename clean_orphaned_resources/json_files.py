@@ -0,0 +1,37 @@
+import json
+import os
+from logging import getLogger
+from typing import Optional
+
+
+logger = getLogger(__name__)
+
+
+def load_json(path: str, version: int) -> Optional[dict]:
+    """
+    Return the JSON object saved at the path with the given version, or None
+    if there is none. Unreadable files and other versions are ignored.
+    """
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable file {path}: {e}")
+        return None
+
+    if not isinstance(data, dict) or data.get("version") != version:
+        return None
+    return data
+
+
+def save_json(path: str, version: int, data: dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Write to a temporary file first so that an interrupted run never
+    # leaves a truncated file behind.
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump({"version": version, **data}, f, separators=(",", ":"))
+    os.replace(temp_path, path)
@@ -0,0 +1,59 @@
+import cProfile
+import pstats
+import sys
+import threading
+from logging import getLogger
+
+
+logger = getLogger(__name__)
+
+TOP_FUNCTIONS = 30
+# From Python 3.12, cProfile is built on sys.monitoring: only one profiler
+# may be active at a time, and it sees the calls of every thread.
+SHARED_PROFILER = sys.version_info >= (3, 12)
+
+_lock = threading.Lock()
+_profiles = []
+
+
+def _profile_thread(frame, event, arg) -> None:
+    # Called once in each new thread: the thread's own profiler replaces this
+    # hook as soon as it is enabled.
+    profile = cProfile.Profile()
+    profile.enable()
+    with _lock:
+        _profiles.append(profile)
+
+
+def start() -> None:
+    """
+    Profile the current thread and every thread started from now on, so that
+    the work done on the pools shows up alongside the main thread. Before
+    Python 3.12, each thread gets a profiler of its own.
+    """
+    profile = cProfile.Profile()
+    profile.enable()
+    with _lock:
+        _profiles[:] = [profile]
+
+    if not SHARED_PROFILER:
+        threading.setprofile(_profile_thread)
+
+
+def stop(path: str = None) -> None:
+    """
+    Print the functions with the highest cumulative time of all threads, and
+    write the merged profile to path for tools such as snakeviz.
+    """
+    if not SHARED_PROFILER:
+        threading.setprofile(None)
+    with _lock:
+        profiles = list(_profiles)
+    profiles[0].disable()
+
+    stats = pstats.Stats(*profiles, stream=sys.stderr)
+    stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+
+    if path:
+        stats.dump_stats(path)
+        logger.info(f"Wrote profile of {len(profiles)} threads to {path}")
@@ -0,0 +1,172 @@
+import time
+from functools import partial
+from logging import getLogger
+from threading import Lock
+
+
+logger = getLogger(__name__)
+
+# Rates (requests per second) that each bucket starts at and never exceeds,
+# following the published per-account, per-region API quotas. Operations
+# that are not listed are assumed to allow DEFAULT_RATE.
+DEFAULT_RATE = 50.0
+OPERATION_RATES = {
+    ("logs", "DescribeLogGroups"): 10.0,
+    ("logs", "DescribeLogStreams"): 25.0,
+    ("logs", "ListTagsLogGroup"): 10.0,
+    ("logs", "DeleteLogGroup"): 10.0,
+    ("logs", "DeleteLogStream"): 15.0,
+    ("kms", "ListKeys"): 100.0,
+    ("kms", "ListAliases"): 100.0,
+    ("kms", "DescribeKey"): 1000.0,
+    ("kms", "ListResourceTags"): 50.0,
+    ("kms", "DisableKey"): 5.0,
+    ("kms", "ScheduleKeyDeletion"): 5.0,
+    ("s3", "DeleteObjects"): 3500.0,
+    ("dynamodb", "ListTagsOfResource"): 10.0,
+    ("dynamodb", "DeleteTable"): 10.0,
+    ("ecr", "BatchDeleteImage"): 20.0,
+    ("ecr", "DeleteRepository"): 20.0,
+    ("efs", "DescribeTags"): 10.0,
+    ("resourcegroupstaggingapi", "GetResources"): 10.0,
+}
+
+MIN_RATE = 0.5
+MULTIPLICATIVE_DECREASE = 0.5
+# Fraction of the maximum rate regained after each successful request.
+ADDITIVE_INCREASE = 0.01
+
+THROTTLING_ERROR_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestThrottledException",
+    "TooManyRequestsException",
+    "ProvisionedThroughputExceededException",
+    "RequestLimitExceeded",
+    "RequestThrottled",
+    "SlowDown",
+    "BandwidthLimitExceeded",
+    "LimitExceededException",
+    "PriorRequestNotComplete",
+}
+
+
+class TokenBucket:
+    """
+    A token bucket whose rate follows AIMD: it is halved whenever a request
+    is throttled and grows back linearly while requests succeed.
+    """
+
+    def __init__(self, max_rate: float):
+        self.max_rate = max_rate
+        self.rate = max_rate
+        self._tokens = 1.0
+        self._last_refill = time.monotonic()
+        self._lock = Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    max(self.rate, 1.0),
+                    self._tokens + (now - self._last_refill) * self.rate,
+                )
+                self._last_refill = now
+
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                delay = (1.0 - self._tokens) / self.rate
+
+            time.sleep(delay)
+
+    def on_throttled(self) -> None:
+        with self._lock:
+            self.rate = max(MIN_RATE, self.rate * MULTIPLICATIVE_DECREASE)
+            self._tokens = min(self._tokens, 0.0)
+
+    def on_success(self) -> None:
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(
+                    self.max_rate, self.rate + self.max_rate * ADDITIVE_INCREASE
+                )
+
+
+_lock = Lock()
+_buckets = {}
+_enabled = True
+
+
+def set_enabled(enabled: bool) -> None:
+    """
+    Turn pacing on or off. Against a local mock such as moto, the real quotas
+    only add sleeps.
+    """
+    global _enabled
+    _enabled = enabled
+
+
+def get_bucket(service_name: str, region_name: str, operation_name: str):
+    """
+    Return the bucket shared by every client of the service in the region.
+    Quotas are set per operation, so each operation has its own bucket.
+    """
+    key = (service_name, region_name, operation_name)
+    with _lock:
+        if key not in _buckets:
+            rate = OPERATION_RATES.get((service_name, operation_name), DEFAULT_RATE)
+            _buckets[key] = TokenBucket(rate)
+        return _buckets[key]
+
+
+def is_throttling_error(response) -> bool:
+    if response is None:
+        return False
+
+    http_response, parsed = response
+    if http_response.status_code == 429:
+        return True
+    return parsed.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES
+
+
+def _before_send(service_name: str, region_name: str, event_name: str, **kwargs):
+    if not _enabled:
+        return
+    operation_name = event_name.rsplit(".", 1)[-1]
+    get_bucket(service_name, region_name, operation_name).acquire()
+
+
+def _needs_retry(
+    service_name: str, region_name: str, response, operation, **kwargs
+) -> None:
+    bucket = get_bucket(service_name, region_name, operation.name)
+
+    if is_throttling_error(response):
+        bucket.on_throttled()
+        logger.debug(
+            f"{service_name}.{operation.name} throttled in {region_name}, "
+            f"rate lowered to {bucket.rate:.1f}/s"
+        )
+    elif response is not None and response[0].status_code < 400:
+        bucket.on_success()
+
+    # Returning None leaves the decision whether to retry to botocore.
+    return None
+
+
+def register(client) -> None:
+    """
+    Rate-limit every attempt the client sends, including retries.
+    """
+    service_name = client.meta.service_model.service_name
+    region_name = client.meta.region_name
+
+    client.meta.events.register(
+        "before-send", partial(_before_send, service_name, region_name)
+    )
+    client.meta.events.register(
+        "needs-retry", partial(_needs_retry, service_name, region_name)
+    )
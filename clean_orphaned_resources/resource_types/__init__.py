@@ -1,20 +1,51 @@
-from clean_orphaned_resources.resource_types import cloudwatch_log_group
-from clean_orphaned_resources.resource_types import dynamodb_table
-from clean_orphaned_resources.resource_types import ecr_repository
-from clean_orphaned_resources.resource_types import efs_file_system
-from clean_orphaned_resources.resource_types import kms_key
-from clean_orphaned_resources.resource_types import s3_bucket
-
-
-_import_classes = [
-    cloudwatch_log_group.CloudWatchLogs,
-    dynamodb_table.DynamoDbTable,
-    ecr_repository.EcrRepository,
-    efs_file_system.EfsFileSystem,
-    kms_key.KmsKey,
-    s3_bucket.S3Bucket,
-]
-
-classes = {}
-for _class in _import_classes:
-    classes[_class.RESOURCE_TYPE] = _class
+import importlib
+from collections.abc import Mapping
+from threading import Lock
+
+
+# The module and class of each resource type. Modules are imported when their
+# resource type is first looked up, so that a command that only touches some
+# resource types never loads the others.
+registry = {
+    "AWS::Logs::LogGroup": ("cloudwatch_log_group", "CloudWatchLogs"),
+    "AWS::DynamoDB::Table": ("dynamodb_table", "DynamoDbTable"),
+    "AWS::ECR::Repository": ("ecr_repository", "EcrRepository"),
+    "AWS::EFS::FileSystem": ("efs_file_system", "EfsFileSystem"),
+    "AWS::KMS::Key": ("kms_key", "KmsKey"),
+    "AWS::S3::Bucket": ("s3_bucket", "S3Bucket"),
+}
+
+
+class _LazyClasses(Mapping):
+    """
+    Map each RESOURCE_TYPE in the registry to its class, importing the module
+    on first access. Membership tests and iteration over the keys import
+    nothing; iterating over the values imports every module.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._classes = {}
+
+    def __getitem__(self, resource_type: str) -> type:
+        _class = self._classes.get(resource_type)
+        if _class is not None:
+            return _class
+
+        module_name, class_name = registry[resource_type]
+        with self._lock:
+            module = importlib.import_module(f"{__name__}.{module_name}")
+            _class = self._classes[resource_type] = getattr(module, class_name)
+        return _class
+
+    def __contains__(self, resource_type: object) -> bool:
+        return resource_type in registry
+
+    def __iter__(self):
+        return iter(registry)
+
+    def __len__(self) -> int:
+        return len(registry)
+
+
+classes = _LazyClasses()
@@ -1,28 +1,73 @@
+import inspect
 from functools import wraps
 from logging import getLogger
-from functools import lru_cache
+from threading import Lock
+from concurrent.futures import Future
+from typing import Iterator, Optional
 
-import boto3
 import botocore.exceptions
 
+from clean_orphaned_resources import snapshot, trace
+from clean_orphaned_resources.clients import get_client
+from clean_orphaned_resources.rate_limit import THROTTLING_ERROR_CODES
+
 
 logger = getLogger(__name__)
 
 
-@lru_cache()
+_account_id_lock = Lock()
+_account_id = None
+
+
 def get_account_id() -> str:
-    sts = boto3.client("sts")
-    identity = sts.get_caller_identity()
-    return identity["Account"]
+    """
+    Return the account ID, looked up once and shared by all threads.
+    """
+    global _account_id
+
+    with _account_id_lock:
+        if _account_id is None:
+            sts = get_client("sts")
+            identity = sts.get_caller_identity()
+            _account_id = identity["Account"]
+        return _account_id
+
+
+def is_throttling_error(e: botocore.exceptions.ClientError) -> bool:
+    return e.response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES
 
 
 def handle_boto3_exceptions(default_return_value=None):
+    """
+    Log client errors and return the default value instead. Throttling errors
+    that remain after botocore's retries are raised, so that a throttled call
+    is never mistaken for a missing resource. With snapshots on, every error
+    that cuts a listing short is raised too, so that the listing is not saved
+    as a snapshot that lost the resources it did not get to.
+    """
+
     def decorator(func):
+        if inspect.isgeneratorfunction(func):
+            # Errors of a generator surface while it is iterated, not when it
+            # is called, so the generator itself has to be wrapped.
+            @wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                try:
+                    yield from func(*args, **kwargs)
+                except botocore.exceptions.ClientError as e:
+                    if is_throttling_error(e) or snapshot.is_enabled():
+                        raise
+                    logger.warning(f"{func.__qualname__}: {e}")
+
+            return generator_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
             try:
                 return func(*args, **kwargs)
             except botocore.exceptions.ClientError as e:
+                if is_throttling_error(e):
+                    raise
                 logger.warning(f"{func.__qualname__}: {e}")
                 return default_return_value
 
@@ -31,13 +76,59 @@ def handle_boto3_exceptions(default_return_value=None):
     return decorator
 
 
+# Methods of every resource type that are recorded as trace spans.
+TRACED_METHODS = (
+    "get_tags",
+    "list_resource_identifiers",
+    "get_resource",
+    "describe_resource",
+    "delete_resource",
+)
+
+
 class ResourceTypeBase:
     RESOURCE_TYPE: str
+    TAGGING_RESOURCE_TYPE: str
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name in TRACED_METHODS:
+            method = cls.__dict__.get(name)
+            if isinstance(method, staticmethod):
+                func = trace.traced(f"{cls.__name__}.{name}", "resource")(
+                    method.__func__
+                )
+                setattr(cls, name, staticmethod(func))
+
+    @staticmethod
+    def list_resource_identifiers(region: str) -> Iterator[tuple[str, dict[str, str]]]:
+        """
+        Yield (identifier, tags) pairs as the resources are found, with the
+        tags as a {key: value} dict.
+        """
+        raise NotImplementedError
 
     @staticmethod
-    def list_resource_identifiers(region: str) -> list[tuple[str, str]]:
+    def get_resource(region: str, identifier: str) -> Optional[dict[str, str]]:
+        """
+        Return the tags of the resource, or None if it no longer exists or is
+        not one that list_resource_identifiers would yield.
+        """
         raise NotImplementedError
 
     @staticmethod
-    def delete_resource(region: str, identifier: str) -> None:
+    def describe_resource(region: str, identifier: str) -> str:
+        """
+        Return details worth reviewing before deletion, such as size or cost
+        drivers, formatted like tags. Types without details return "".
+        """
+        return ""
+
+    @staticmethod
+    def delete_resource(region: str, identifier: str) -> Optional[Future]:
+        """
+        Delete the resource, raising botocore.exceptions.ClientError on failure.
+        Deletions that have to wait for the service may return a Future that
+        completes, or fails, once the resource is gone.
+        """
         raise NotImplementedError
@@ -1,7 +1,13 @@
+import os
+import string
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
 from logging import getLogger
+from typing import Iterator, Optional
 
-import boto3
-
+from clean_orphaned_resources import filters, snapshot
+from clean_orphaned_resources.clients import get_client
+from clean_orphaned_resources.resource_types import tag_index
 from clean_orphaned_resources.resource_types.base import (
     ResourceTypeBase,
     handle_boto3_exceptions,
@@ -10,39 +16,212 @@ from clean_orphaned_resources.resource_types.base import (
 
 logger = getLogger(__name__)
 
+# Characters allowed in log group names.
+LOG_GROUP_NAME_CHARACTERS = string.ascii_letters + string.digits + "#-./_"
+SHARD_WORKERS = 8
+SPLIT_AFTER_PAGES = 20
+MAX_SHARD_PREFIX_LENGTH = 32
+# A shard splits only when it has read this many pages per new shard, which
+# keeps the calls for new shards that turn out to be empty to a fraction of
+# the calls of a sequential listing.
+PAGES_PER_NEW_SHARD = 4
+
+_sharded_listing = False
+
+
+def get_creation_time(log_group: dict) -> datetime:
+    # creationTime is in milliseconds since the epoch.
+    return datetime.fromtimestamp(log_group["creationTime"] / 1000, timezone.utc)
+
+
+def enable_sharded_listing(enabled: bool = True) -> None:
+    global _sharded_listing
+    _sharded_listing = enabled
+
 
 class CloudWatchLogs(ResourceTypeBase):
     RESOURCE_TYPE = "AWS::Logs::LogGroup"
+    TAGGING_RESOURCE_TYPE = "logs:log-group"
 
     @staticmethod
-    @handle_boto3_exceptions("")
-    def get_tags(client, name: str) -> str:
+    @handle_boto3_exceptions({})
+    def get_tags(client, name: str) -> dict[str, str]:
         response = client.list_tags_log_group(logGroupName=name)
-        return ",".join([f"{key}={value}" for key, value in response["tags"].items()])
+        return response["tags"]
 
     @staticmethod
-    @handle_boto3_exceptions([])
-    def list_resource_identifiers(region: str) -> list[tuple[str, str]]:
-        client = boto3.client("logs", region_name=region)
-        response = client.describe_log_groups()
-        identifiers = []
+    def get_resource(region: str, identifier: str) -> Optional[dict[str, str]]:
+        client = get_client("logs", region_name=region)
+        response = client.describe_log_groups(logGroupNamePrefix=identifier)
+
+        for log_group in response["logGroups"]:
+            if log_group["logGroupName"] == identifier:
+                tags = tag_index.get_tags(
+                    region,
+                    log_group["arn"].removesuffix(":*"),
+                    get_creation_time(log_group),
+                )
+                if tags is None:
+                    tags = CloudWatchLogs.get_tags(client, identifier)
+                return tags
+        return None
+
+    @staticmethod
+    def list_log_groups(client, prefix: str = "") -> Iterator[dict]:
+        kwargs = {"logGroupNamePrefix": prefix} if prefix else {}
+        response = client.describe_log_groups(**kwargs)
 
         while response:
-            for log_group in response["logGroups"]:
-                tags = CloudWatchLogs.get_tags(client, log_group["logGroupName"])
-                identifiers.append((log_group["logGroupName"], tags))
+            yield from response["logGroups"]
 
             if "nextToken" in response:
-                response = client.describe_log_groups(nextToken=response["nextToken"])
+                response = client.describe_log_groups(
+                    nextToken=response["nextToken"], **kwargs
+                )
             else:
                 response = None
 
-        return identifiers
+    @staticmethod
+    def split_shard(shard_prefix: str, first: str, last: str) -> tuple[str, list[str]]:
+        """
+        Split the names of a shard that sort after last, where the shard has
+        just read the names from first to last. Return the prefix of the names
+        that continue last at the character where first and last differ, and
+        the prefixes of the names after those, one per later character at that
+        position or at any position before it.
+        """
+        depth = len(os.path.commonprefix([first, last]))
+        later_prefixes = [
+            last[:index] + character
+            for index in range(len(shard_prefix), depth + 1)
+            for character in sorted(LOG_GROUP_NAME_CHARACTERS)
+            if character > last[index]
+        ]
+        return last[: depth + 1], later_prefixes
+
+    @staticmethod
+    def list_shard(
+        client, query_prefix: str, shard_prefix: str, token: str = None, pages: int = 0
+    ) -> tuple[list[dict], Optional[tuple], list[str]]:
+        """
+        Page through the log groups of one shard, the names that start with
+        shard_prefix, for up to SPLIT_AFTER_PAGES pages. Return them, the
+        shard that continues where this one stopped (or None), and the
+        prefixes of new shards split off from it.
+
+        describe_log_groups returns names in ASCII order, so the continuation
+        keeps the token of its query and stops at the first name past its
+        shard. Once the shard has read PAGES_PER_NEW_SHARD pages per new shard,
+        the names after the last one read are split off into new shards. No
+        page is read by more than one shard.
+        """
+        kwargs = {"logGroupNamePrefix": query_prefix} if query_prefix else {}
+        log_groups = []
+
+        for _ in range(SPLIT_AFTER_PAGES):
+            if token:
+                kwargs["nextToken"] = token
+            response = client.describe_log_groups(**kwargs)
+            pages += 1
+
+            for log_group in response["logGroups"]:
+                if not log_group["logGroupName"].startswith(shard_prefix):
+                    return log_groups, None, []
+                log_groups.append(log_group)
+
+            token = response.get("nextToken")
+            if not token:
+                return log_groups, None, []
+
+        if log_groups and log_groups[0] != log_groups[-1]:
+            next_shard_prefix, later_prefixes = CloudWatchLogs.split_shard(
+                shard_prefix,
+                log_groups[0]["logGroupName"],
+                log_groups[-1]["logGroupName"],
+            )
+            if (
+                len(next_shard_prefix) <= MAX_SHARD_PREFIX_LENGTH
+                and len(later_prefixes) * PAGES_PER_NEW_SHARD <= pages
+            ):
+                return (
+                    log_groups,
+                    (query_prefix, next_shard_prefix, token, 0),
+                    later_prefixes,
+                )
+
+        return log_groups, (query_prefix, shard_prefix, token, pages), []
+
+    @staticmethod
+    def list_log_groups_sharded(client, prefix: str = "") -> Iterator[dict]:
+        """
+        List the log groups under the prefix by logGroupNamePrefix shards paged
+        concurrently. Shards are split off as the listing finds out how the
+        names branch, and never overlap, so no deduplication is needed.
+        """
+        with ThreadPoolExecutor(max_workers=SHARD_WORKERS) as executor:
+            pending = {
+                executor.submit(CloudWatchLogs.list_shard, client, prefix, prefix)
+            }
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    log_groups, continuation, child_prefixes = future.result()
+
+                    if continuation:
+                        pending.add(
+                            executor.submit(
+                                CloudWatchLogs.list_shard, client, *continuation
+                            )
+                        )
+                    for child_prefix in child_prefixes:
+                        pending.add(
+                            executor.submit(
+                                CloudWatchLogs.list_shard,
+                                client,
+                                child_prefix,
+                                child_prefix,
+                            )
+                        )
+
+                    yield from log_groups
+
+    @staticmethod
+    @handle_boto3_exceptions([])
+    def list_resource_identifiers(region: str) -> Iterator[tuple[str, dict[str, str]]]:
+        client = get_client("logs", region_name=region)
+        # --name-prefix is passed on as logGroupNamePrefix, so that only the
+        # matching log groups are listed.
+        prefix = filters.get_name_prefix() or ""
+
+        if _sharded_listing:
+            log_groups = CloudWatchLogs.list_log_groups_sharded(client, prefix)
+        else:
+            log_groups = CloudWatchLogs.list_log_groups(client, prefix)
+
+        for log_group in log_groups:
+            # The Tagging API reports log group ARNs without the ":*" suffix.
+            arn = log_group["arn"].removesuffix(":*")
+            if not filters.is_candidate(region, log_group["logGroupName"], arn):
+                continue
+
+            tags = tag_index.get_tags(region, arn, get_creation_time(log_group))
+            if tags is None:
+                # A log group created before the previous snapshot is the
+                # same log group that the snapshot recorded the tags of.
+                tags = snapshot.get_reusable_tags(
+                    region,
+                    CloudWatchLogs.RESOURCE_TYPE,
+                    log_group["logGroupName"],
+                    log_group["creationTime"],
+                )
+            if tags is None:
+                tags = CloudWatchLogs.get_tags(client, log_group["logGroupName"])
+            yield log_group["logGroupName"], tags
 
     @staticmethod
-    @handle_boto3_exceptions()
     def delete_resource(region: str, identifier: str) -> None:
-        client = boto3.client("logs", region_name=region)
+        client = get_client("logs", region_name=region)
 
         log_streams = client.describe_log_streams(logGroupName=identifier)
 
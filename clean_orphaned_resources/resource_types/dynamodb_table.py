@@ -1,7 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from logging import getLogger
+from typing import Iterator, Optional
 
-import boto3
-
+from clean_orphaned_resources import filters
+from clean_orphaned_resources.clients import get_client
+from clean_orphaned_resources.resource_types import tag_index
 from clean_orphaned_resources.resource_types.base import (
     get_account_id,
     ResourceTypeBase,
@@ -11,32 +15,85 @@ from clean_orphaned_resources.resource_types.base import (
 
 logger = getLogger(__name__)
 
+TAG_WORKERS = 8
+
 
 class DynamoDbTable(ResourceTypeBase):
     RESOURCE_TYPE = "AWS::DynamoDB::Table"
+    TAGGING_RESOURCE_TYPE = "dynamodb:table"
 
     @staticmethod
-    @handle_boto3_exceptions("")
-    def get_tags(client, arn: str) -> str:
+    @handle_boto3_exceptions({})
+    def get_tags(client, arn: str) -> dict[str, str]:
         response = client.list_tags_of_resource(ResourceArn=arn)
-        return ",".join([f"{tag['Key']}={tag['Value']}" for tag in response["Tags"]])
+        return tag_index.to_tag_map(response["Tags"])
 
     @staticmethod
-    @handle_boto3_exceptions([])
-    def list_resource_identifiers(region: str) -> list[tuple[str, str]]:
-        client = boto3.client("dynamodb", region_name=region)
-        response = client.list_tables()
-        identifiers = []
+    def get_arn(region: str, account_id: str, name: str) -> str:
+        return f"arn:aws:dynamodb:{region}:{account_id}:table/{name}"
 
-        for name in response.get("TableNames", []):
-            arn = f"arn:aws:dynamodb:{region}:{get_account_id()}:table/{name}"
+    @staticmethod
+    def resolve_table(
+        client, region: str, account_id: str, name: str
+    ) -> tuple[str, dict[str, str]]:
+        arn = DynamoDbTable.get_arn(region, account_id, name)
+        tags = tag_index.get_tags(region, arn)
+        if tags is None:
             tags = DynamoDbTable.get_tags(client, arn)
-            identifiers.append((name, tags))
+        return name, tags
+
+    @staticmethod
+    @handle_boto3_exceptions([])
+    def list_resource_identifiers(region: str) -> Iterator[tuple[str, dict[str, str]]]:
+        client = get_client("dynamodb", region_name=region)
+        account_id = get_account_id()
+        paginator = client.get_paginator("list_tables")
+        names = [
+            name
+            for page in paginator.paginate()
+            for name in page["TableNames"]
+            if filters.is_candidate(
+                region, name, DynamoDbTable.get_arn(region, account_id, name)
+            )
+        ]
+
+        with ThreadPoolExecutor(max_workers=TAG_WORKERS) as executor:
+            yield from executor.map(
+                partial(DynamoDbTable.resolve_table, client, region, account_id),
+                names,
+            )
+
+    @staticmethod
+    def get_resource(region: str, identifier: str) -> Optional[dict[str, str]]:
+        client = get_client("dynamodb", region_name=region)
+        try:
+            table = client.describe_table(TableName=identifier)["Table"]
+        except client.exceptions.ResourceNotFoundException:
+            return None
 
-        return identifiers
+        if table["TableStatus"] == "DELETING":
+            return None
+        tags = tag_index.get_tags(
+            region, table["TableArn"], table.get("CreationDateTime")
+        )
+        if tags is None:
+            tags = DynamoDbTable.get_tags(client, table["TableArn"])
+        return tags
+
+    @staticmethod
+    @handle_boto3_exceptions("")
+    def describe_resource(region: str, identifier: str) -> str:
+        client = get_client("dynamodb", region_name=region)
+        table = client.describe_table(TableName=identifier)["Table"]
+        billing_mode = table.get("BillingModeSummary", {}).get(
+            "BillingMode", "PROVISIONED"
+        )
+        return (
+            f"TableSizeBytes={table['TableSizeBytes']},"
+            f"ItemCount={table['ItemCount']},BillingMode={billing_mode}"
+        )
 
     @staticmethod
-    @handle_boto3_exceptions()
     def delete_resource(region: str, identifier: str) -> None:
-        client = boto3.client("dynamodb", region_name=region)
+        client = get_client("dynamodb", region_name=region)
         client.delete_table(TableName=identifier)
@@ -1,10 +1,13 @@
+from concurrent.futures import ThreadPoolExecutor
 from logging import getLogger
+from threading import BoundedSemaphore
+from typing import Iterator, Optional
 from functools import lru_cache
 
-import boto3
-
+from clean_orphaned_resources import filters
+from clean_orphaned_resources.clients import get_client
+from clean_orphaned_resources.resource_types import tag_index
 from clean_orphaned_resources.resource_types.base import (
-    get_account_id,
     ResourceTypeBase,
     handle_boto3_exceptions,
 )
@@ -12,43 +15,127 @@ from clean_orphaned_resources.resource_types.base import (
 
 logger = getLogger(__name__)
 
+# BatchDeleteImage accepts at most 100 image IDs per request.
+DELETE_BATCH_SIZE = 100
+PURGE_WORKERS = 8
+
 
 class EcrRepository(ResourceTypeBase):
     RESOURCE_TYPE = "AWS::ECR::Repository"
+    TAGGING_RESOURCE_TYPE = "ecr:repository"
 
     @staticmethod
-    @handle_boto3_exceptions("")
-    def get_tags(client, arn: str) -> str:
+    @handle_boto3_exceptions({})
+    def get_tags(client, arn: str) -> dict[str, str]:
         response = client.list_tags_for_resource(resourceArn=arn)
-        return ",".join([f"{tag['Key']}={tag['Value']}" for tag in response["tags"]])
+        return tag_index.to_tag_map(response["tags"])
 
     @staticmethod
     @handle_boto3_exceptions([])
-    def list_resource_identifiers(region: str) -> list[tuple[str, str]]:
-        client = boto3.client("ecr", region_name=region)
+    def list_resource_identifiers(region: str) -> Iterator[tuple[str, dict[str, str]]]:
+        client = get_client("ecr", region_name=region)
         paginator = client.get_paginator("describe_repositories")
 
-        identifiers = []
-
         for page in paginator.paginate():
             for repo in page["repositories"]:
                 name = repo["repositoryName"]
-                arn = f"arn:aws:ecr:{region}:{get_account_id()}:repository/{name}"
-                tags = EcrRepository.get_tags(client, arn)
-                identifiers.append((name, tags))
+                arn = repo["repositoryArn"]
+                if not filters.is_candidate(region, name, arn):
+                    continue
 
-        return identifiers
+                tags = tag_index.get_tags(region, arn, repo["createdAt"])
+                if tags is None:
+                    tags = EcrRepository.get_tags(client, arn)
+                yield name, tags
 
     @staticmethod
-    @handle_boto3_exceptions()
-    def delete_resource(region: str, identifier: str) -> None:
-        client = boto3.client("ecr", region_name=region)
+    def get_resource(region: str, identifier: str) -> Optional[dict[str, str]]:
+        client = get_client("ecr", region_name=region)
+        try:
+            response = client.describe_repositories(repositoryNames=[identifier])
+        except client.exceptions.RepositoryNotFoundException:
+            return None
+
+        repo = response["repositories"][0]
+        arn = repo["repositoryArn"]
+        tags = tag_index.get_tags(region, arn, repo["createdAt"])
+        if tags is None:
+            tags = EcrRepository.get_tags(client, arn)
+        return tags
+
+    @staticmethod
+    def list_image_batches(client, repository: str) -> Iterator[list[dict]]:
+        """
+        Yield the digests of every image in the repository, across all pages,
+        in batches that BatchDeleteImage accepts.
+        """
+        paginator = client.get_paginator("list_images")
+        digests = set()
+        batch = []
+
+        for page in paginator.paginate(repositoryName=repository):
+            for image_id in page["imageIds"]:
+                # An image with several tags is listed once per tag, but
+                # deleting its digest removes all of them.
+                digest = image_id.get("imageDigest")
+                if digest and digest not in digests:
+                    digests.add(digest)
+                    batch.append({"imageDigest": digest})
+                    if len(batch) == DELETE_BATCH_SIZE:
+                        yield batch
+                        batch = []
+
+        if batch:
+            yield batch
 
-        images = client.list_images(repositoryName=identifier)
+    @staticmethod
+    def delete_images(client, repository: str, image_ids: list[dict]) -> int:
+        response = client.batch_delete_image(
+            repositoryName=repository, imageIds=image_ids
+        )
+        for failure in response.get("failures", []):
+            if failure["failureCode"] != "ImageNotFound":
+                logger.warning(
+                    f"Failed to delete {failure['imageId']} from '{repository}': "
+                    f"{failure['failureReason']}"
+                )
+        return len(response.get("imageIds", []))
+
+    @staticmethod
+    def purge_repository(client, repository: str) -> int:
+        """
+        Hand each batch to the delete pool as soon as it is listed, blocking
+        while too many batches are already in flight, so that deletion starts
+        with the first page and the listing is never held in memory.
+        """
+        in_flight = BoundedSemaphore(PURGE_WORKERS * 2)
+        futures = []
+
+        with ThreadPoolExecutor(max_workers=PURGE_WORKERS) as executor:
+            for batch in EcrRepository.list_image_batches(client, repository):
+                in_flight.acquire()
+                future = executor.submit(
+                    EcrRepository.delete_images, client, repository, batch
+                )
+                future.add_done_callback(lambda f: in_flight.release())
+                futures.append(future)
+
+        deleted = sum(future.result() for future in futures)
+
+        logger.info(f"Repository '{repository}': {deleted} images deleted")
+        return deleted
+
+    @staticmethod
+    def delete_resource(region: str, identifier: str) -> None:
+        client = get_client("ecr", region_name=region)
 
-        if images.get("imageIds"):
-            client.batch_delete_image(
-                repositoryName=identifier, imageIds=images["imageIds"]
-            )
+        EcrRepository.purge_repository(client, identifier)
 
-        client.delete_repository(repositoryName=identifier)
+        try:
+            client.delete_repository(repositoryName=identifier)
+        except client.exceptions.RepositoryNotEmptyException:
+            # Images pushed during the purge, or children of manifest lists
+            # that could not be deleted on their own, are removed with the
+            # repository.
+            logger.info(f"Repository '{identifier}' is not empty, forcing deletion")
+            client.delete_repository(repositoryName=identifier, force=True)
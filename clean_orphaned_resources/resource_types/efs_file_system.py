@@ -1,7 +1,12 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from logging import getLogger
+from threading import Lock, Thread
+from typing import Iterator, Optional
 
-import boto3
-
+from clean_orphaned_resources import filters
+from clean_orphaned_resources.clients import get_client
+from clean_orphaned_resources.resource_types import tag_index
 from clean_orphaned_resources.resource_types.base import (
     ResourceTypeBase,
     handle_boto3_exceptions,
@@ -10,33 +15,210 @@ from clean_orphaned_resources.resource_types.base import (
 
 logger = getLogger(__name__)
 
+TEARDOWN_WORKERS = 8
+POLL_INTERVAL = 5
+# A file system whose mount targets are still there after POLL_TIMEOUT
+# seconds, or a region that fails MAX_FAILED_POLLS polls in a row, fails the
+# pending deletions instead of waiting forever.
+POLL_TIMEOUT = 600
+MAX_FAILED_POLLS = 5
+
+
+def iter_file_systems(client) -> Iterator[dict]:
+    paginator = client.get_paginator("describe_file_systems")
+    for page in paginator.paginate():
+        yield from page.get("FileSystems", [])
+
+
+class PendingFileSystems:
+    """
+    File systems of one region that wait for their mount targets to be
+    deleted. A single thread polls all of them with one paginated
+    describe_file_systems per round, instead of one waiter per file system,
+    and deletes each one as soon as it has no mount targets left.
+    """
+
+    def __init__(self, region: str):
+        self.region = region
+        self._futures = {}
+        self._deadlines = {}
+        self._lock = Lock()
+        self._thread = None
+
+    def add(self, file_system_id: str) -> Future:
+        future = Future()
+        with self._lock:
+            self._futures[file_system_id] = future
+            self._deadlines[file_system_id] = time.monotonic() + POLL_TIMEOUT
+            if self._thread is None:
+                self._thread = Thread(target=self._poll, daemon=True)
+                self._thread.start()
+        return future
+
+    def _poll(self) -> None:
+        client = get_client("efs", region_name=self.region)
+        failed_polls = 0
+
+        while True:
+            time.sleep(POLL_INTERVAL)
+            with self._lock:
+                if not self._futures:
+                    self._thread = None
+                    return
+                pending = set(self._futures)
+
+            try:
+                mount_targets = {
+                    fs["FileSystemId"]: fs.get("NumberOfMountTargets", 0)
+                    for fs in iter_file_systems(client)
+                }
+            except Exception as e:
+                failed_polls += 1
+                logger.warning(f"Polling file systems in {self.region}: {e}")
+                if failed_polls >= MAX_FAILED_POLLS:
+                    for fs_id in pending:
+                        self._fail(fs_id, e)
+                continue
+            failed_polls = 0
+
+            now = time.monotonic()
+            for fs_id in pending:
+                if mount_targets.get(fs_id, 0) == 0:
+                    self._delete(client, fs_id)
+                elif now > self._deadlines[fs_id]:
+                    self._fail(
+                        fs_id,
+                        TimeoutError(
+                            f"Mount targets of {fs_id} were not deleted "
+                            f"within {POLL_TIMEOUT} seconds"
+                        ),
+                    )
+
+    def _fail(self, file_system_id: str, exception: Exception) -> None:
+        with self._lock:
+            future = self._futures.pop(file_system_id)
+            del self._deadlines[file_system_id]
+        future.set_exception(exception)
+
+    def _delete(self, client, file_system_id: str) -> None:
+        try:
+            client.delete_file_system(FileSystemId=file_system_id)
+        except client.exceptions.FileSystemInUse as e:
+            # The mount targets are gone from the listing but not yet from the
+            # file system. Try again in the next round, until the deadline.
+            if time.monotonic() > self._deadlines[file_system_id]:
+                self._fail(file_system_id, e)
+            return
+        except client.exceptions.FileSystemNotFound:
+            pass
+        except Exception as e:
+            self._fail(file_system_id, e)
+            return
+
+        with self._lock:
+            future = self._futures.pop(file_system_id)
+            del self._deadlines[file_system_id]
+        future.set_result(None)
+
+
+_lock = Lock()
+_pending = {}
+
+
+def get_pending_file_systems(region: str) -> PendingFileSystems:
+    with _lock:
+        if region not in _pending:
+            _pending[region] = PendingFileSystems(region)
+        return _pending[region]
+
 
 class EfsFileSystem(ResourceTypeBase):
     RESOURCE_TYPE = "AWS::EFS::FileSystem"
+    TAGGING_RESOURCE_TYPE = "elasticfilesystem:file-system"
 
     @staticmethod
-    @handle_boto3_exceptions("")
-    def get_tags(client, file_system_id: str) -> str:
+    @handle_boto3_exceptions({})
+    def get_tags(client, file_system_id: str) -> dict[str, str]:
         response = client.describe_tags(FileSystemId=file_system_id)
-        tags = response.get("Tags", [])
-        return ",".join([f"{tag['Key']}={tag['Value']}" for tag in tags])
+        return tag_index.to_tag_map(response.get("Tags", []))
 
     @staticmethod
     @handle_boto3_exceptions([])
-    def list_resource_identifiers(region: str) -> list[tuple[str, str]]:
-        client = boto3.client("efs", region_name=region)
-        response = client.describe_file_systems()
-        file_systems = response.get("FileSystems", [])
+    def list_resource_identifiers(region: str) -> Iterator[tuple[str, dict[str, str]]]:
+        client = get_client("efs", region_name=region)
 
-        identifiers = []
-        for fs in file_systems:
+        for fs in iter_file_systems(client):
             fs_id = fs.get("FileSystemId")
-            tags = EfsFileSystem.get_tags(client, fs_id)
-            identifiers.append((fs_id, tags))
-        return identifiers
+            if not filters.is_candidate(region, fs_id, fs.get("FileSystemArn")):
+                continue
+
+            tags = tag_index.get_tags(
+                region, fs.get("FileSystemArn"), fs.get("CreationTime")
+            )
+            if tags is None:
+                tags = EfsFileSystem.get_tags(client, fs_id)
+            yield fs_id, tags
 
     @staticmethod
-    @handle_boto3_exceptions()
-    def delete_resource(region: str, identifier: str) -> None:
-        client = boto3.client("efs", region_name=region)
-        client.delete_file_system(FileSystemId=identifier)
+    def get_resource(region: str, identifier: str) -> Optional[dict[str, str]]:
+        client = get_client("efs", region_name=region)
+        try:
+            response = client.describe_file_systems(FileSystemId=identifier)
+        except client.exceptions.FileSystemNotFound:
+            return None
+
+        fs = response["FileSystems"][0]
+        if fs["LifeCycleState"] in ("deleting", "deleted"):
+            return None
+        tags = tag_index.get_tags(
+            region, fs.get("FileSystemArn"), fs.get("CreationTime")
+        )
+        if tags is None:
+            tags = EfsFileSystem.get_tags(client, identifier)
+        return tags
+
+    @staticmethod
+    def delete_resource(region: str, identifier: str) -> Optional[Future]:
+        """
+        Delete the mount targets and access points concurrently. A file system
+        can only be deleted once its mount targets are gone, which takes a
+        while, so the returned future completes when the file system itself
+        has been deleted.
+        """
+        client = get_client("efs", region_name=region)
+
+        mount_target_ids = [
+            mount_target["MountTargetId"]
+            for page in client.get_paginator("describe_mount_targets").paginate(
+                FileSystemId=identifier
+            )
+            for mount_target in page.get("MountTargets", [])
+        ]
+        access_point_ids = [
+            access_point["AccessPointId"]
+            for page in client.get_paginator("describe_access_points").paginate(
+                FileSystemId=identifier
+            )
+            for access_point in page.get("AccessPoints", [])
+        ]
+
+        with ThreadPoolExecutor(max_workers=TEARDOWN_WORKERS) as executor:
+            futures = [
+                executor.submit(client.delete_mount_target, MountTargetId=mt_id)
+                for mt_id in mount_target_ids
+            ] + [
+                executor.submit(client.delete_access_point, AccessPointId=ap_id)
+                for ap_id in access_point_ids
+            ]
+            for future in futures:
+                future.result()
+
+        if not mount_target_ids:
+            client.delete_file_system(FileSystemId=identifier)
+            return None
+
+        logger.info(
+            f"Deleted {len(mount_target_ids)} mount targets of {identifier}, "
+            f"waiting to delete the file system"
+        )
+        return get_pending_file_systems(region).add(identifier)
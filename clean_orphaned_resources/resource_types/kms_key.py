@@ -1,7 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from logging import getLogger
+from typing import Iterator, Optional
 
-import boto3
-
+from clean_orphaned_resources import filters
+from clean_orphaned_resources.clients import get_client
+from clean_orphaned_resources.resource_types import tag_index
 from clean_orphaned_resources.resource_types.base import (
     ResourceTypeBase,
     handle_boto3_exceptions,
@@ -10,49 +14,117 @@ from clean_orphaned_resources.resource_types.base import (
 
 logger = getLogger(__name__)
 
+DESCRIBE_WORKERS = 8
+
+# Key metadata described during this run, keyed by (region, key ID).
+_key_metadata = {}
+
+
+def reset_key_metadata() -> None:
+    _key_metadata.clear()
+
 
 class KmsKey(ResourceTypeBase):
     RESOURCE_TYPE = "AWS::KMS::Key"
+    TAGGING_RESOURCE_TYPE = "kms:key"
 
     @staticmethod
-    @handle_boto3_exceptions("")
-    def get_tags(client, key_id: str) -> str:
+    @handle_boto3_exceptions({})
+    def get_tags(client, key_id: str) -> dict[str, str]:
         response = client.list_resource_tags(KeyId=key_id)
-        return ",".join(
-            [f"{tag['TagKey']}={tag['TagValue']}" for tag in response["Tags"]]
+        return {tag["TagKey"]: tag["TagValue"] for tag in response["Tags"]}
+
+    @staticmethod
+    def list_aws_managed_key_ids(client) -> set[str]:
+        """
+        Return the IDs of the keys behind alias/aws/* aliases, which are
+        managed by AWS services and never need to be described.
+        """
+        paginator = client.get_paginator("list_aliases")
+        key_ids = set()
+
+        for page in paginator.paginate():
+            for alias in page["Aliases"]:
+                if alias["AliasName"].startswith("alias/aws/") and alias.get(
+                    "TargetKeyId"
+                ):
+                    key_ids.add(alias["TargetKeyId"])
+
+        return key_ids
+
+    @staticmethod
+    def describe_key(client, region: str, key_id: str) -> dict:
+        """
+        Return the key metadata, described at most once per key during a run.
+        """
+        key = (region, key_id)
+        if key not in _key_metadata:
+            _key_metadata[key] = client.describe_key(KeyId=key_id)["KeyMetadata"]
+        return _key_metadata[key]
+
+    @staticmethod
+    def resolve_key(
+        client, region: str, key: dict
+    ) -> Optional[tuple[str, dict[str, str]]]:
+        """
+        Return (key ID, tags) for a deletable key, or None for keys that are
+        managed by AWS or not enabled.
+        """
+        key_id = key["KeyId"]
+        key_metadata = KmsKey.describe_key(client, region, key_id)
+        if (
+            key_metadata["KeyManager"] != "CUSTOMER"
+            or key_metadata["KeyState"] != "Enabled"
+        ):
+            return None
+
+        tags = tag_index.get_tags(
+            region, key["KeyArn"], key_metadata.get("CreationDate")
         )
+        if tags is None:
+            tags = KmsKey.get_tags(client, key_id)
+        return key_id, tags
 
     @staticmethod
     @handle_boto3_exceptions([])
-    def list_resource_identifiers(region: str) -> list[tuple[str, str]]:
-        client = boto3.client("kms", region_name=region)
-        response = client.list_keys()
-        identifiers = []
-
-        while response:
-            for key in response["Keys"]:
-                key_id = key["KeyId"]
-                key_metadata = client.describe_key(KeyId=key_id)
-                if (
-                    key_metadata["KeyMetadata"]["KeyManager"] == "CUSTOMER"
-                    and key_metadata["KeyMetadata"]["KeyState"] == "Enabled"
-                ):
-                    tags = KmsKey.get_tags(client, key_id)
-                    identifiers.append((key_id, tags))
+    def list_resource_identifiers(region: str) -> Iterator[tuple[str, dict[str, str]]]:
+        client = get_client("kms", region_name=region)
+        aws_managed_key_ids = KmsKey.list_aws_managed_key_ids(client)
+
+        paginator = client.get_paginator("list_keys")
+        keys = [
+            key
+            for page in paginator.paginate()
+            for key in page["Keys"]
+            if key["KeyId"] not in aws_managed_key_ids
+            and filters.is_candidate(region, key["KeyId"], key["KeyArn"])
+        ]
 
-            if "NextMarker" in response:
-                response = client.list_keys(Marker=response["NextMarker"])
-            else:
-                response = None
+        with ThreadPoolExecutor(max_workers=DESCRIBE_WORKERS) as executor:
+            for identifier in executor.map(
+                partial(KmsKey.resolve_key, client, region), keys
+            ):
+                if identifier:
+                    yield identifier
 
-        return identifiers
+    @staticmethod
+    def get_resource(region: str, identifier: str) -> Optional[dict[str, str]]:
+        client = get_client("kms", region_name=region)
+        try:
+            key_metadata = KmsKey.describe_key(client, region, identifier)
+        except client.exceptions.NotFoundException:
+            return None
+
+        resolved = KmsKey.resolve_key(
+            client, region, {"KeyId": identifier, "KeyArn": key_metadata["Arn"]}
+        )
+        return resolved[1] if resolved else None
 
     @staticmethod
-    @handle_boto3_exceptions()
     def delete_resource(region: str, identifier: str) -> None:
-        client = boto3.client("kms", region_name=region)
+        client = get_client("kms", region_name=region)
 
-        key_metadata = client.describe_key(KeyId=identifier)["KeyMetadata"]
+        key_metadata = KmsKey.describe_key(client, region, identifier)
         if key_metadata["KeyState"] not in ("PendingDeletion", "Invalid"):
             client.disable_key(KeyId=identifier)
 
@@ -1,8 +1,14 @@
+import string
+from concurrent.futures import ThreadPoolExecutor
 from logging import getLogger
+from threading import BoundedSemaphore, Lock
+from typing import Iterator, Optional
 
-import boto3
 import botocore.exceptions
 
+from clean_orphaned_resources import filters
+from clean_orphaned_resources.clients import get_client
+from clean_orphaned_resources.resource_types import tag_index
 from clean_orphaned_resources.resource_types.base import (
     ResourceTypeBase,
     handle_boto3_exceptions,
@@ -11,70 +17,355 @@ from clean_orphaned_resources.resource_types.base import (
 
 logger = getLogger(__name__)
 
+# DeleteObjects accepts at most 1000 keys per request.
+DELETE_BATCH_SIZE = 1000
+PURGE_WORKERS = 8
+PROGRESS_INTERVAL = 10000
+MAX_PURGE_PASSES = 5
+LOCATION_WORKERS = 16
+LIST_BUCKETS_PAGE_SIZE = 1000
+# Keys after the first page are partitioned into key ranges that end at
+# each of these characters. Keys that start with any other character fall
+# into the range of the next one, such as upper case letters into "a".
+PARTITION_BOUNDARIES = string.digits + string.ascii_lowercase
+
+_bucket_regions_lock = Lock()
+_bucket_regions = None
+
+
+def reset_bucket_regions() -> None:
+    global _bucket_regions
+
+    with _bucket_regions_lock:
+        _bucket_regions = None
+
+
+def get_bucket_location(client, bucket: str) -> str:
+    response = client.get_bucket_location(Bucket=bucket)
+    location = response["LocationConstraint"]
+    # Buckets in us-east-1 have no location constraint, and "EU" is the
+    # legacy name of eu-west-1.
+    if location is None:
+        return "us-east-1"
+    if location == "EU":
+        return "eu-west-1"
+    return location
+
+
+def build_bucket_regions() -> dict[str, str]:
+    client = get_client("s3")
+    paginator = client.get_paginator("list_buckets")
+    bucket_regions = {}
+    unknown = []
+    # Buckets filtered out by name are neither listed nor located.
+    prefix = filters.get_name_prefix()
+    kwargs = {"Prefix": prefix} if prefix else {}
+
+    for page in paginator.paginate(
+        PaginationConfig={"PageSize": LIST_BUCKETS_PAGE_SIZE}, **kwargs
+    ):
+        for bucket in page["Buckets"]:
+            if not filters.match_name(bucket["Name"]):
+                continue
+            if bucket.get("BucketRegion"):
+                bucket_regions[bucket["Name"]] = bucket["BucketRegion"]
+            else:
+                unknown.append(bucket["Name"])
+
+    def resolve(bucket: str):
+        try:
+            return bucket, get_bucket_location(client, bucket)
+        except botocore.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] == "NoSuchBucket":
+                logger.info(f"Bucket '{bucket}' not found, skipping.")
+                return bucket, None
+            raise
+
+    with ThreadPoolExecutor(max_workers=LOCATION_WORKERS) as executor:
+        for bucket, bucket_region in executor.map(resolve, unknown):
+            if bucket_region is not None:
+                bucket_regions[bucket] = bucket_region
+
+    logger.info(
+        f"Indexed the regions of {len(bucket_regions)} buckets "
+        f"({len(unknown)} location lookups)"
+    )
+    return bucket_regions
+
+
+def get_bucket_regions() -> dict[str, str]:
+    """
+    Return the region of every bucket in the account. list_buckets returns
+    all buckets whatever the region, so the index is built once per run and
+    each region reads its own slice from it.
+    """
+    global _bucket_regions
+
+    with _bucket_regions_lock:
+        if _bucket_regions is None:
+            _bucket_regions = build_bucket_regions()
+        return _bucket_regions
+
+
+class PurgeProgress:
+    def __init__(self, bucket: str):
+        self.bucket = bucket
+        self.deleted = 0
+        self.errors = 0
+        self._reported = 0
+        self._lock = Lock()
+
+    def add(self, future, count: int) -> None:
+        try:
+            errors = future.result()
+        except botocore.exceptions.ClientError as e:
+            logger.warning(
+                f"Failed to delete {count} objects from '{self.bucket}': {e}"
+            )
+            errors = count
+
+        with self._lock:
+            self.deleted += count - errors
+            self.errors += errors
+            if self.deleted - self._reported >= PROGRESS_INTERVAL:
+                self._reported = self.deleted
+                logger.info(f"Bucket '{self.bucket}': {self.deleted} objects deleted")
+
 
 class S3Bucket(ResourceTypeBase):
     RESOURCE_TYPE = "AWS::S3::Bucket"
+    TAGGING_RESOURCE_TYPE = "s3:bucket"
 
     @staticmethod
-    @handle_boto3_exceptions("")
-    def get_tags(client, name: str) -> str:
+    @handle_boto3_exceptions({})
+    def get_tags(client, name: str) -> dict[str, str]:
         response = client.get_bucket_tagging(Bucket=name)
-        return ",".join([f"{tag['Key']}={tag['Value']}" for tag in response["TagSet"]])
+        return tag_index.to_tag_map(response["TagSet"])
 
     @staticmethod
     @handle_boto3_exceptions([])
-    def list_resource_identifiers(region: str) -> list[tuple[str, str]]:
-        client = boto3.client("s3", region_name=region)
-        response = client.list_buckets()
-        identifiers = []
-
-        for bucket in response["Buckets"]:
-            bucket_name = bucket["Name"]
-            try:
-                bucket_location_response = client.get_bucket_location(
-                    Bucket=bucket_name
-                )
-                bucket_region = bucket_location_response["LocationConstraint"]
+    def list_resource_identifiers(region: str) -> Iterator[tuple[str, dict[str, str]]]:
+        client = get_client("s3", region_name=region)
+
+        for bucket_name, bucket_region in get_bucket_regions().items():
+            if bucket_region != region:
+                continue
+            arn = f"arn:aws:s3:::{bucket_name}"
+            if not filters.is_candidate(region, bucket_name, arn):
+                continue
 
-                if bucket_region == region or (
-                    bucket_region is None and region == "us-east-1"
-                ):
-                    tags = S3Bucket.get_tags(client, bucket_name)
-                    identifiers.append((bucket_name, tags))
+            tags = tag_index.get_tags(region, arn)
+            if tags is None:
+                tags = S3Bucket.get_tags(client, bucket_name)
+            yield bucket_name, tags
 
-            except botocore.exceptions.ClientError as e:
-                if e.response["Error"]["Code"] == "NoSuchBucket":
-                    logger.info(f"Bucket '{bucket_name}' not found, skipping.")
-                else:
-                    raise e
+    @staticmethod
+    def get_resource(region: str, identifier: str) -> Optional[dict[str, str]]:
+        client = get_client("s3", region_name=region)
+        try:
+            get_bucket_location(client, identifier)
+        except botocore.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] == "NoSuchBucket":
+                return None
+            raise
 
-        return identifiers
+        tags = tag_index.get_tags(region, f"arn:aws:s3:::{identifier}")
+        if tags is None:
+            tags = S3Bucket.get_tags(client, identifier)
+        return tags
 
     @staticmethod
-    @handle_boto3_exceptions()
-    def delete_resource(region: str, identifier: str) -> None:
-        client = boto3.client("s3", region_name=region)
+    def list_page(
+        client, bucket: str, versioned: bool, key_marker: str, version_id_marker: str
+    ) -> tuple[list[dict], Optional[tuple[str, str]]]:
+        """
+        Return one page of objects (or, for versioned buckets, versions and
+        delete markers) after the markers as DeleteObjects entries, and the
+        markers of the next page, or None after the last page.
+        """
+        if versioned:
+            kwargs = {"Bucket": bucket}
+            if key_marker:
+                kwargs["KeyMarker"] = key_marker
+            if version_id_marker:
+                kwargs["VersionIdMarker"] = version_id_marker
+            page = client.list_object_versions(**kwargs)
+            objects = [
+                {"Key": version["Key"], "VersionId": version["VersionId"]}
+                for version in page.get("Versions", []) + page.get("DeleteMarkers", [])
+            ]
+            if not page.get("IsTruncated"):
+                return objects, None
+            return objects, (page["NextKeyMarker"], page.get("NextVersionIdMarker", ""))
+
+        kwargs = {"Bucket": bucket}
+        if key_marker:
+            kwargs["StartAfter"] = key_marker
+        page = client.list_objects_v2(**kwargs)
+        objects = [{"Key": obj["Key"]} for obj in page.get("Contents", [])]
+        if not page.get("IsTruncated"):
+            return objects, None
+        return objects, (objects[-1]["Key"], "")
 
-        versioning = client.get_bucket_versioning(Bucket=identifier)
+    @staticmethod
+    def iter_objects(
+        client, bucket: str, versioned: bool, partition: tuple[str, str, Optional[str]]
+    ) -> Iterator[dict]:
+        """
+        Yield every entry in the key range of the partition, which starts
+        after its markers and ends with its last key (or runs to the end of
+        the bucket if that is None), across all pages.
+        """
+        key_marker, version_id_marker, last_key = partition
+        markers = (key_marker, version_id_marker)
 
-        if versioning.get("Status") == "Enabled":
-            object_versions = client.list_object_versions(Bucket=identifier)
+        while markers:
+            objects, markers = S3Bucket.list_page(client, bucket, versioned, *markers)
+            for obj in objects:
+                if last_key is not None and obj["Key"] > last_key:
+                    return
+                yield obj
 
-            for version in object_versions.get("Versions", []):
-                client.delete_object(
-                    Bucket=identifier,
-                    Key=version["Key"],
-                    VersionId=version["VersionId"],
-                )
+    @staticmethod
+    def list_partitions(
+        client, bucket: str, versioned: bool
+    ) -> tuple[list[dict], list[tuple[str, str, Optional[str]]]]:
+        """
+        Return the entries of the first page of the bucket, and the partitions
+        of the keys after it: one key range up to each character in
+        PARTITION_BOUNDARIES that sorts after the last key read, and one for the
+        rest. Buckets that fit in one page need no partitions.
+        """
+        objects, markers = S3Bucket.list_page(client, bucket, versioned, "", "")
+        if not markers:
+            return objects, []
+
+        key_marker, version_id_marker = markers
+        boundaries = [
+            boundary for boundary in PARTITION_BOUNDARIES if boundary > key_marker
+        ]
+        # The first partition continues the first page, including the other
+        # versions of its last key.
+        starts = [(key_marker, version_id_marker)] + [
+            (boundary, "") for boundary in boundaries
+        ]
+        ends = boundaries + [None]
+        return objects, [
+            (start, version_id, end) for (start, version_id), end in zip(starts, ends)
+        ]
+
+    @staticmethod
+    def delete_objects(client, bucket: str, objects: list[dict]) -> int:
+        response = client.delete_objects(
+            Bucket=bucket, Delete={"Objects": objects, "Quiet": True}
+        )
+        errors = response.get("Errors", [])
+        for error in errors:
+            logger.warning(
+                f"Failed to delete s3://{bucket}/{error['Key']}: {error['Message']}"
+            )
+        return len(errors)
+
+    @staticmethod
+    def submit_batch(
+        client,
+        bucket: str,
+        objects: list[dict],
+        delete_executor: ThreadPoolExecutor,
+        in_flight: BoundedSemaphore,
+        progress: PurgeProgress,
+    ) -> None:
+        in_flight.acquire()
+        future = delete_executor.submit(
+            S3Bucket.delete_objects, client, bucket, objects
+        )
+        future.add_done_callback(lambda f: in_flight.release())
+        future.add_done_callback(lambda f: progress.add(f, len(objects)))
 
-            for marker in object_versions.get("DeleteMarkers", []):
-                client.delete_object(
-                    Bucket=identifier, Key=marker["Key"], VersionId=marker["VersionId"]
+    @staticmethod
+    def purge_partition(
+        client,
+        bucket: str,
+        versioned: bool,
+        partition: tuple[str, str, Optional[str]],
+        delete_executor: ThreadPoolExecutor,
+        in_flight: BoundedSemaphore,
+        progress: PurgeProgress,
+    ) -> None:
+        """
+        Page through one partition and hand each full batch to the delete
+        pool, blocking while too many batches are already in flight.
+        """
+        batch = []
+        for obj in S3Bucket.iter_objects(client, bucket, versioned, partition):
+            batch.append(obj)
+            if len(batch) == DELETE_BATCH_SIZE:
+                S3Bucket.submit_batch(
+                    client, bucket, batch, delete_executor, in_flight, progress
                 )
+                batch = []
+
+        if batch:
+            S3Bucket.submit_batch(
+                client, bucket, batch, delete_executor, in_flight, progress
+            )
+
+    @staticmethod
+    def purge_bucket(client, bucket: str) -> PurgeProgress:
+        """
+        Delete every object, version and delete marker in the bucket. The
+        first page is deleted as it is, and each key range after it is
+        listed concurrently, with its batches deleted by a shared pool of
+        DeleteObjects workers.
+        """
+        versioning = client.get_bucket_versioning(Bucket=bucket)
+        # Suspended buckets may still hold versions created while enabled.
+        versioned = versioning.get("Status") in ("Enabled", "Suspended")
+
+        progress = PurgeProgress(bucket)
+        in_flight = BoundedSemaphore(PURGE_WORKERS * 2)
+
+        # Keys deleted while a listing is still paging can shift its markers,
+        # so repeat until a pass no longer finds anything to delete.
+        for _ in range(MAX_PURGE_PASSES):
+            deleted_before = progress.deleted
+            objects, partitions = S3Bucket.list_partitions(client, bucket, versioned)
 
-        objects = client.list_objects_v2(Bucket=identifier)
+            with ThreadPoolExecutor(max_workers=PURGE_WORKERS) as delete_executor:
+                if objects:
+                    S3Bucket.submit_batch(
+                        client, bucket, objects, delete_executor, in_flight, progress
+                    )
+                with ThreadPoolExecutor(max_workers=PURGE_WORKERS) as list_executor:
+                    futures = [
+                        list_executor.submit(
+                            S3Bucket.purge_partition,
+                            client,
+                            bucket,
+                            versioned,
+                            partition,
+                            delete_executor,
+                            in_flight,
+                            progress,
+                        )
+                        for partition in partitions
+                    ]
+                    for future in futures:
+                        future.result()
+
+            if progress.deleted == deleted_before:
+                break
+
+        logger.info(
+            f"Bucket '{bucket}': {progress.deleted} objects deleted, "
+            f"{progress.errors} errors"
+        )
+        return progress
+
+    @staticmethod
+    def delete_resource(region: str, identifier: str) -> None:
+        client = get_client("s3", region_name=region)
 
-        for obj in objects.get("Contents", []):
-            client.delete_object(Bucket=identifier, Key=obj["Key"])
+        S3Bucket.purge_bucket(client, identifier)
 
         client.delete_bucket(Bucket=identifier)
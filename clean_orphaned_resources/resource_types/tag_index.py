@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta, timezone
+from logging import getLogger
+from threading import Lock
+from typing import Optional
+
+import botocore.exceptions
+
+from clean_orphaned_resources import trace
+from clean_orphaned_resources.clients import get_client
+
+
+logger = getLogger(__name__)
+
+# Resources created this long before a scan started may still be missing
+# from it, since the Tagging API catches up with new resources with a delay.
+SCAN_LAG = timedelta(minutes=5)
+
+_lock = Lock()
+_region_locks = {}
+_indexes = {}
+_scan_started_at = {}
+_resource_type_filters = None
+_tag_filters = None
+
+
+def enable(
+    resource_type_filters: list[str], tag_filters: dict[str, set[str]] = None
+) -> None:
+    """
+    Read tags in bulk from the Resource Groups Tagging API, one scan per region
+    restricted to the given resource types (e.g. "logs:log-group"). With
+    tag_filters, the scan only returns the resources that match them.
+    """
+    global _resource_type_filters, _tag_filters
+
+    with _lock:
+        _resource_type_filters = resource_type_filters
+        _tag_filters = tag_filters
+        _indexes.clear()
+        _scan_started_at.clear()
+
+
+def disable() -> None:
+    global _resource_type_filters, _tag_filters
+
+    with _lock:
+        _resource_type_filters = None
+        _tag_filters = None
+        _indexes.clear()
+        _scan_started_at.clear()
+
+
+def to_tag_map(tags: list[dict]) -> dict[str, str]:
+    return {tag["Key"]: tag["Value"] for tag in tags}
+
+
+@trace.traced("tag_index.build_index")
+def build_index(region: str) -> Optional[dict[str, dict[str, str]]]:
+    """
+    Return the tags of the resources in the region by ARN, or None if the scan
+    failed.
+    """
+    client = get_client("resourcegroupstaggingapi", region_name=region)
+    paginator = client.get_paginator("get_resources")
+    kwargs = {}
+    if _tag_filters:
+        kwargs["TagFilters"] = [
+            {"Key": key, "Values": sorted(values)} if values else {"Key": key}
+            for key, values in _tag_filters.items()
+        ]
+    index = {}
+
+    try:
+        for page in paginator.paginate(
+            ResourceTypeFilters=_resource_type_filters, ResourcesPerPage=100, **kwargs
+        ):
+            for mapping in page["ResourceTagMappingList"]:
+                index[mapping["ResourceARN"]] = to_tag_map(mapping.get("Tags", []))
+    except botocore.exceptions.ClientError as e:
+        logger.warning(f"Falling back to per-resource tag calls in {region}: {e}")
+        return None
+
+    logger.info(f"Indexed tags of {len(index)} resources in {region} region")
+    return index
+
+
+def get_index(region: str) -> Optional[dict[str, dict[str, str]]]:
+    with _lock:
+        region_lock = _region_locks.setdefault(region, Lock())
+
+    # Only the first resource type of a region scans; the others wait for it.
+    with region_lock:
+        if region not in _indexes:
+            _scan_started_at[region] = datetime.now(timezone.utc)
+            _indexes[region] = build_index(region)
+        return _indexes[region]
+
+
+def get_tags(
+    region: str, arn: str, created_at: datetime = None
+) -> Optional[dict[str, str]]:
+    """
+    Return the tags of the resource from the bulk index, or None if they have
+    to be read one by one: when bulk tags are disabled, the scan failed, or
+    the resource was created too recently for the scan to know it.
+
+    The Tagging API does not return resources that have never been tagged, so
+    a resource that a complete scan left out has no tags. Resources whose
+    creation time is not given are taken to be older than the scan.
+    """
+    if _resource_type_filters is None:
+        return None
+    index = get_index(region)
+    if index is None:
+        return None
+    if arn in index:
+        return index[arn]
+    if created_at is not None and created_at > _scan_started_at[region] - SCAN_LAG:
+        return None
+    return {}
+
+
+def is_excluded(region: str, arn: str) -> bool:
+    """
+    Return whether the scan left the resource out because its tags do not
+    match the tag filters, so that its tags need not be read one by one.
+    """
+    if _resource_type_filters is None or not _tag_filters:
+        return False
+    index = get_index(region)
+    return index is not None and arn not in index
@@ -0,0 +1,174 @@
+import os
+import time
+from threading import Lock
+from typing import Optional
+
+from clean_orphaned_resources.json_files import load_json, save_json
+
+
+SNAPSHOT_VERSION = 1
+# Tags reused from one snapshot to the next are read again once they are
+# older than this (in milliseconds), so that tag changes are picked up.
+MAX_TAG_REUSE_AGE = 24 * 60 * 60 * 1000
+
+_lock = Lock()
+_snapshot_dir = None
+_account_id = None
+_previous = {}
+_reused = {}
+
+
+def enable(snapshot_dir: str, account_id: str) -> None:
+    """
+    Save a snapshot of every (region, resource type) inventory listed from
+    now on, and let resource types reuse what the previous snapshot recorded.
+    """
+    global _snapshot_dir, _account_id
+
+    with _lock:
+        _snapshot_dir = snapshot_dir
+        _account_id = account_id
+        _previous.clear()
+        _reused.clear()
+
+
+def disable() -> None:
+    global _snapshot_dir, _account_id
+
+    with _lock:
+        _snapshot_dir = None
+        _account_id = None
+        _previous.clear()
+        _reused.clear()
+
+
+def is_enabled() -> bool:
+    return _snapshot_dir is not None
+
+
+def get_snapshot_path(region: str, resource_type: str) -> str:
+    file_name = resource_type.replace("::", "-") + ".json"
+    return os.path.join(_snapshot_dir, "snapshots", _account_id, region, file_name)
+
+
+def load(path: str) -> Optional[dict]:
+    """
+    Return a dict like:
+    {"taken_at": <epoch ms>, "resources": {"<name>": {<tags>}}, "orphans": [...],
+     "tags_read_at": {"<name>": <epoch ms>}}
+    where tags_read_at only holds the resources whose tags were reused from
+    an earlier snapshot; the others were read at taken_at.
+    """
+    return load_json(path, SNAPSHOT_VERSION)
+
+
+def save(path: str, data: dict) -> None:
+    save_json(path, SNAPSHOT_VERSION, data)
+
+
+def get_previous(region: str, resource_type: str) -> Optional[dict]:
+    """
+    Return the previous snapshot of the inventory, or None if snapshots are
+    disabled or none was taken yet. Each snapshot is read at most once.
+    """
+    if _snapshot_dir is None:
+        return None
+
+    key = (region, resource_type)
+    with _lock:
+        if key not in _previous:
+            _previous[key] = load(get_snapshot_path(region, resource_type))
+        return _previous[key]
+
+
+def get_reusable_tags(
+    region: str, resource_type: str, name: str, created_at: int
+) -> Optional[dict[str, str]]:
+    """
+    Return the tags that the previous snapshot recorded for a resource that
+    was created (in epoch milliseconds) before the snapshot was taken, or
+    None. A resource created later may have replaced one of the same name.
+    Tags read more than MAX_TAG_REUSE_AGE ago are not reused either.
+    """
+    previous = get_previous(region, resource_type)
+    if previous is None or created_at >= previous["taken_at"]:
+        return None
+    tags = previous["resources"].get(name)
+    if tags is None:
+        return None
+
+    read_at = previous.get("tags_read_at", {}).get(name, previous["taken_at"])
+    if int(time.time() * 1000) - read_at > MAX_TAG_REUSE_AGE:
+        return None
+    with _lock:
+        _reused[(region, resource_type, name)] = read_at
+    return tags
+
+
+def pop_reused_tags_read_at(
+    region: str, resource_type: str, name: str
+) -> Optional[int]:
+    """
+    Return when the tags that get_reusable_tags returned for the resource
+    were originally read, or None if they were not reused.
+    """
+    with _lock:
+        return _reused.pop((region, resource_type, name), None)
+
+
+class SnapshotRecorder:
+    """
+    Record one (region, resource type) inventory as it is listed and save it
+    as the next snapshot. Only the orphans that the previous snapshot did not
+    have are passed on to the writer, followed by the orphans gone since.
+    """
+
+    def __init__(self, writer, region: str, resource_type: str):
+        self._writer = writer
+        self._region = region
+        self._resource_type = resource_type
+        # Taken before listing, so that resources created during the listing
+        # count as newer than this snapshot.
+        self._taken_at = int(time.time() * 1000)
+        self._resources = {}
+        self._tags_read_at = {}
+        self._orphans = set()
+        previous = get_previous(region, resource_type)
+        self._previous_resources = previous["resources"] if previous else {}
+        self._previous_orphans = set(previous["orphans"]) if previous else set()
+
+    def add_listed(self, name: str, tags: dict[str, str]) -> None:
+        self._resources[name] = tags
+        read_at = pop_reused_tags_read_at(self._region, self._resource_type, name)
+        if read_at is not None:
+            self._tags_read_at[name] = read_at
+
+    def write(
+        self,
+        region: str,
+        resource_type: str,
+        resource_name: str,
+        tags: dict[str, str],
+    ) -> None:
+        self._orphans.add(resource_name)
+        if resource_name not in self._previous_orphans:
+            self._writer.write(region, resource_type, resource_name, tags)
+
+    def finish(self) -> None:
+        for name in sorted(self._previous_orphans - self._orphans):
+            self._writer.write_removed(
+                self._region,
+                self._resource_type,
+                name,
+                self._previous_resources.get(name, {}),
+            )
+
+        save(
+            get_snapshot_path(self._region, self._resource_type),
+            {
+                "taken_at": self._taken_at,
+                "resources": self._resources,
+                "orphans": sorted(self._orphans),
+                "tags_read_at": self._tags_read_at,
+            },
+        )
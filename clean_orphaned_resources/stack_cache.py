@@ -0,0 +1,45 @@
+import os
+
+from clean_orphaned_resources.json_files import load_json, save_json
+
+
+CACHE_VERSION = 1
+
+
+def get_default_cache_dir() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "clean-orphaned-resources")
+
+
+def get_cache_path(cache_dir: str, account_id: str, region: str) -> str:
+    return os.path.join(cache_dir, "stacks", account_id, f"{region}.json")
+
+
+def get_stack_version(stack: dict) -> str:
+    """
+    Return a key that changes whenever the stack may have changed its resources.
+    """
+    updated = stack.get("LastUpdatedTime") or stack["CreationTime"]
+    return f"{updated.isoformat()}|{stack['StackStatus']}"
+
+
+def load(path: str) -> dict[str, dict]:
+    """
+    Return a dict like: {"<StackId>": {"version": "...", "resources": [...]}}
+    """
+    data = load_json(path, CACHE_VERSION)
+    return data["stacks"] if data else {}
+
+
+def save(path: str, stacks: dict[str, dict]) -> None:
+    save_json(path, CACHE_VERSION, {"stacks": stacks})
+
+
+def slim_stack_resource(stack_resource: dict) -> dict:
+    return {
+        key: stack_resource[key]
+        for key in ("ResourceType", "PhysicalResourceId", "ResourceStatus")
+        if key in stack_resource
+    }
@@ -0,0 +1,265 @@
+import json
+import time
+from functools import partial
+from logging import getLogger
+from threading import Lock
+
+from clean_orphaned_resources.rate_limit import is_throttling_error
+
+
+logger = getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets. Latencies cover a
+# whole API call, including rate limiting and retries.
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRIC_PREFIX = "clean_orphaned_resources_api"
+
+
+class OperationStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.throttles = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latency_sum = 0.0
+        # One count per bucket of LATENCY_BUCKETS, plus one for slower calls.
+        self.latency_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def add_latency(self, latency: float) -> None:
+        self.latency_sum += latency
+        for i, upper_bound in enumerate(LATENCY_BUCKETS):
+            if latency <= upper_bound:
+                self.latency_counts[i] += 1
+                return
+        self.latency_counts[-1] += 1
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "throttles": self.throttles,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "latency_sum": round(self.latency_sum, 6),
+            "latency_buckets": {
+                str(upper_bound): count
+                for upper_bound, count in zip(
+                    LATENCY_BUCKETS + ("+Inf",), self.latency_counts
+                )
+            },
+        }
+
+
+_lock = Lock()
+_enabled = False
+_started = None
+_operations = {}
+
+
+def enable() -> None:
+    """
+    Start recording every API call made by the clients of clients.get_client.
+    """
+    global _enabled, _started
+
+    with _lock:
+        _enabled = True
+        _started = time.monotonic()
+        _operations.clear()
+
+
+def _update(service_name: str, region_name: str, operation_name: str, update):
+    if not _enabled:
+        return
+
+    key = (service_name, operation_name, region_name)
+    with _lock:
+        if key not in _operations:
+            _operations[key] = OperationStats()
+        update(_operations[key])
+
+
+def _before_call(context: dict, **kwargs) -> None:
+    context["stats_started"] = time.monotonic()
+
+
+def _after_call(
+    service_name: str, region_name: str, http_response, parsed, model, context, **kwargs
+) -> None:
+    latency = time.monotonic() - context.get("stats_started", time.monotonic())
+    retries = parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+
+    def update(operation: OperationStats) -> None:
+        operation.calls += 1
+        operation.retries += retries
+        if http_response.status_code >= 300:
+            operation.errors += 1
+        operation.add_latency(latency)
+
+    _update(service_name, region_name, model.name, update)
+
+
+def _after_call_error(
+    service_name: str, region_name: str, event_name: str, context, **kwargs
+) -> None:
+    latency = time.monotonic() - context.get("stats_started", time.monotonic())
+    operation_name = event_name.rsplit(".", 1)[-1]
+
+    def update(operation: OperationStats) -> None:
+        operation.calls += 1
+        operation.errors += 1
+        operation.add_latency(latency)
+
+    _update(service_name, region_name, operation_name, update)
+
+
+def _before_send(
+    service_name: str, region_name: str, event_name: str, request, **kwargs
+):
+    body = request.body
+    size = len(body) if isinstance(body, (bytes, str)) else 0
+    operation_name = event_name.rsplit(".", 1)[-1]
+
+    def update(operation: OperationStats) -> None:
+        operation.bytes_sent += size
+
+    _update(service_name, region_name, operation_name, update)
+
+
+def _needs_retry(service_name: str, region_name: str, response, operation, **kwargs):
+    if response is None:
+        return None
+
+    http_response, parsed = response
+    if "content-length" in http_response.headers:
+        size = int(http_response.headers["content-length"])
+    elif not operation.has_streaming_output:
+        size = len(http_response.content)
+    else:
+        # Reading a streaming body here would consume it.
+        size = 0
+    throttled = is_throttling_error(response)
+
+    def update(operation_stats: OperationStats) -> None:
+        operation_stats.bytes_received += size
+        if throttled:
+            operation_stats.throttles += 1
+
+    _update(service_name, region_name, operation.name, update)
+
+    # Returning None leaves the decision whether to retry to botocore.
+    return None
+
+
+def register(client) -> None:
+    service_name = client.meta.service_model.service_name
+    region_name = client.meta.region_name
+
+    client.meta.events.register("before-call", _before_call)
+    client.meta.events.register(
+        "after-call", partial(_after_call, service_name, region_name)
+    )
+    client.meta.events.register(
+        "after-call-error", partial(_after_call_error, service_name, region_name)
+    )
+    client.meta.events.register(
+        "before-send", partial(_before_send, service_name, region_name)
+    )
+    client.meta.events.register(
+        "needs-retry", partial(_needs_retry, service_name, region_name)
+    )
+
+
+def get_report() -> dict:
+    with _lock:
+        operations = [
+            {
+                "service": service_name,
+                "operation": operation_name,
+                "region": region_name,
+                **operation.to_dict(),
+            }
+            for (service_name, operation_name, region_name), operation in sorted(
+                _operations.items()
+            )
+        ]
+        wall_time = time.monotonic() - _started if _started is not None else 0.0
+
+    return {"wall_time": round(wall_time, 3), "operations": operations}
+
+
+def format_openmetrics(report: dict) -> str:
+    lines = []
+
+    counters = [
+        ("calls", "API calls"),
+        ("errors", "API calls that failed"),
+        ("retries", "Retried attempts"),
+        ("throttles", "Throttled attempts"),
+        ("bytes_sent", "Request bytes sent"),
+        ("bytes_received", "Response bytes received"),
+    ]
+    for field, help_text in counters:
+        name = f"{METRIC_PREFIX}_{field}"
+        lines.append(f"# TYPE {name} counter")
+        lines.append(f"# HELP {name} {help_text}.")
+        for operation in report["operations"]:
+            lines.append(f"{name}_total{{{_labels(operation)}}} {operation[field]}")
+
+    name = f"{METRIC_PREFIX}_latency_seconds"
+    lines.append(f"# TYPE {name} histogram")
+    lines.append(f"# HELP {name} Latency of API calls, including retries.")
+    for operation in report["operations"]:
+        labels = _labels(operation)
+        cumulative = 0
+        for upper_bound, count in operation["latency_buckets"].items():
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{upper_bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {operation['latency_sum']}")
+        lines.append(f"{name}_count{{{labels}}} {operation['calls']}")
+
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def _labels(operation: dict) -> str:
+    return ",".join(
+        f'{label}="{operation[label]}"' for label in ("service", "operation", "region")
+    )
+
+
+def write_report(path: str, stats_format: str = "json") -> None:
+    report = get_report()
+    with open(path, "w") as f:
+        if stats_format == "openmetrics":
+            f.write(format_openmetrics(report))
+        else:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+
+def log_summary() -> None:
+    """
+    Log one line per (service, operation, region), slowest in total first.
+    """
+    report = get_report()
+    operations = sorted(
+        report["operations"], key=lambda operation: -operation["latency_sum"]
+    )
+
+    logger.info(f"API calls in {report['wall_time']}s:")
+    for operation in operations:
+        average = (
+            operation["latency_sum"] / operation["calls"] if operation["calls"] else 0
+        )
+        logger.info(
+            f"{operation['service']}.{operation['operation']} "
+            f"({operation['region']}): {operation['calls']} calls, "
+            f"{operation['latency_sum']:.1f}s total, {average * 1000:.0f}ms avg, "
+            f"{operation['retries']} retries, {operation['throttles']} throttled, "
+            f"{operation['errors']} errors"
+        )
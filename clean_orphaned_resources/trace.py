@@ -0,0 +1,121 @@
+import inspect
+import json
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+from logging import getLogger
+from threading import Lock, current_thread, get_ident
+
+
+logger = getLogger(__name__)
+
+_lock = Lock()
+_enabled = False
+_started = None
+_events = []
+_named_threads = set()
+
+
+def enable() -> None:
+    """
+    Start recording spans as Chrome trace events, which Perfetto and
+    chrome://tracing open as one timeline row per thread.
+    """
+    global _enabled, _started
+
+    with _lock:
+        _enabled = True
+        _started = time.perf_counter()
+        _events.clear()
+        _named_threads.clear()
+
+
+def _record(name: str, category: str, started: float, args: dict) -> None:
+    thread_id = get_ident()
+    event = {
+        "name": name,
+        "cat": category,
+        "ph": "X",
+        "ts": round((started - _started) * 1e6),
+        "dur": round((time.perf_counter() - started) * 1e6),
+        "pid": os.getpid(),
+        "tid": thread_id,
+        "args": args,
+    }
+
+    with _lock:
+        if thread_id not in _named_threads:
+            _named_threads.add(thread_id)
+            _events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": os.getpid(),
+                    "tid": thread_id,
+                    "args": {"name": current_thread().name},
+                }
+            )
+        _events.append(event)
+
+
+@contextmanager
+def span(name: str, category: str = "app", **args):
+    if not _enabled:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, category, started, args)
+
+
+def traced(name: str = None, category: str = "app"):
+    """
+    Record a span for every call. The string arguments of the call, such as
+    the region and the resource identifier, become the arguments of the span.
+    A generator's span lasts until it is exhausted.
+    """
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        def get_args(args: tuple) -> dict:
+            return {
+                f"arg{i}": arg for i, arg in enumerate(args) if isinstance(arg, str)
+            }
+
+        if inspect.isgeneratorfunction(func):
+
+            @wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return (yield from func(*args, **kwargs))
+
+                with span(span_name, category, **get_args(args)):
+                    return (yield from func(*args, **kwargs))
+
+            return generator_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+
+            with span(span_name, category, **get_args(args)):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def write(path: str) -> None:
+    with _lock:
+        events = list(_events)
+
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    logger.info(f"Wrote {len(events)} trace events to {path}")
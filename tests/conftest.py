@@ -0,0 +1,14 @@
+import pytest
+
+
+@pytest.fixture
+def mocked_aws(monkeypatch):
+    """
+    Run the test against moto instead of a real AWS account.
+    """
+    moto = pytest.importorskip("moto")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.delenv("AWS_CA_BUNDLE", raising=False)
+    with moto.mock_aws():
+        yield
@@ -0,0 +1,52 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+import pytest
+
+from clean_orphaned_resources import clients, rate_limit
+
+REGION = "us-east-1"
+
+
+class TestRequestSlots:
+    @pytest.fixture(autouse=True)
+    def setup(self, mocked_aws):
+        # Pacing to the real quotas would keep the requests from overlapping.
+        rate_limit.set_enabled(False)
+        clients.configure(2)
+        self.client = clients.get_client("logs", region_name=REGION)
+        self.lock = Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # Counted after a request takes its slot and before it gives it back.
+        self.client.meta.events.register("before-send", self.on_send)
+        self.client.meta.events.register_first("response-received", self.on_response)
+        yield
+        clients.configure(16)
+        rate_limit.set_enabled(True)
+
+    def on_send(self, **kwargs):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.01)
+
+    def on_response(self, **kwargs):
+        with self.lock:
+            self.in_flight -= 1
+
+    def test_requests_in_flight_are_capped_across_pools(self):
+        def describe(_):
+            return self.client.describe_log_groups()
+
+        # Nested pools of a resource type add up to more threads than slots.
+        with ThreadPoolExecutor(max_workers=4) as outer:
+            with ThreadPoolExecutor(max_workers=4) as inner:
+                futures = [outer.submit(describe, i) for i in range(20)]
+                futures += [inner.submit(describe, i) for i in range(20)]
+                for future in futures:
+                    future.result()
+
+        assert self.max_in_flight == 2
+        assert self.in_flight == 0
@@ -0,0 +1,76 @@
+from collections import Counter
+
+import boto3
+import pytest
+
+from clean_orphaned_resources import clients
+from clean_orphaned_resources.resource_types import cloudwatch_log_group
+from clean_orphaned_resources.resource_types.cloudwatch_log_group import (
+    CloudWatchLogs,
+)
+
+REGION = "us-east-1"
+
+
+class TestShardedListing:
+    @pytest.fixture(autouse=True)
+    def setup(self, mocked_aws):
+        self.logs_client = boto3.client("logs", region_name=REGION)
+        self.client = clients.get_client("logs", region_name=REGION)
+        self.prefixes = Counter()
+        self.client.meta.events.register(
+            "before-parameter-build.logs.DescribeLogGroups", self.record_call
+        )
+        yield
+        self.client.meta.events.unregister(
+            "before-parameter-build.logs.DescribeLogGroups", self.record_call
+        )
+
+    def record_call(self, params, **kwargs):
+        self.prefixes[params.get("logGroupNamePrefix", "")] += 1
+
+    def create_log_groups(self, names: list[str]) -> None:
+        for name in names:
+            self.logs_client.create_log_group(logGroupName=name)
+
+    def list_names(self, sharded: bool) -> tuple[list[str], int]:
+        """
+        Return the names listed and the number of describe_log_groups calls.
+        """
+        self.prefixes.clear()
+        if sharded:
+            log_groups = CloudWatchLogs.list_log_groups_sharded(self.client)
+        else:
+            log_groups = CloudWatchLogs.list_log_groups(self.client)
+        names = [log_group["logGroupName"] for log_group in log_groups]
+        return names, sum(self.prefixes.values())
+
+    def test_split_shards_continue_where_they_stopped(self, monkeypatch):
+        # moto returns 50 log groups per page. With names in binary, splits
+        # need few new shards and happen after a few pages.
+        monkeypatch.setattr(cloudwatch_log_group, "SPLIT_AFTER_PAGES", 2)
+        monkeypatch.setattr(cloudwatch_log_group, "LOG_GROUP_NAME_CHARACTERS", "/01")
+        self.create_log_groups([f"/{i:011b}" for i in range(2000)])
+
+        sequential, sequential_calls = self.list_names(sharded=False)
+        sharded, sharded_calls = self.list_names(sharded=True)
+
+        assert sequential_calls == 40
+        assert sorted(sharded) == sequential
+        assert len(self.prefixes) > 1
+        # Only the last page of each shard and the shards that turn out to be
+        # empty add calls.
+        assert sharded_calls <= sequential_calls * 1.25
+
+    def test_small_account_is_not_split(self):
+        self.create_log_groups(
+            [f"/aws/lambda/function-{i:04d}" for i in range(1000)]
+            + [f"/aws/codebuild/project-{i:03d}" for i in range(200)]
+        )
+
+        sequential, sequential_calls = self.list_names(sharded=False)
+        sharded, sharded_calls = self.list_names(sharded=True)
+
+        assert sharded == sequential
+        assert sharded_calls == sequential_calls == 24
+        assert list(self.prefixes) == [""]
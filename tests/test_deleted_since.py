@@ -0,0 +1,62 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import boto3
+import pytest
+
+from clean_orphaned_resources.app import CleanOrphanedResources
+
+REGION = "us-east-1"
+RESOURCE_TYPE = "AWS::Logs::LogGroup"
+
+
+def get_template(log_group_names: list[str], deletion_policy: str) -> str:
+    return json.dumps(
+        {
+            "Resources": {
+                f"LogGroup{i}": {
+                    "Type": RESOURCE_TYPE,
+                    "DeletionPolicy": deletion_policy,
+                    "Properties": {"LogGroupName": name},
+                }
+                for i, name in enumerate(log_group_names)
+            }
+        }
+    )
+
+
+class TestDeletedSince:
+    @pytest.fixture(autouse=True)
+    def setup(self, mocked_aws):
+        self.app = CleanOrphanedResources()
+        cf_client = boto3.client("cloudformation", region_name=REGION)
+        logs_client = boto3.client("logs", region_name=REGION)
+
+        cf_client.create_stack(
+            StackName="deleted-stack",
+            TemplateBody=get_template(["/retained", "/gone", "/adopted"], "Retain"),
+        )
+        cf_client.delete_stack(StackName="deleted-stack")
+
+        # One retained log group was deleted by hand since, and another one
+        # of the same name now belongs to a live stack.
+        logs_client.delete_log_group(logGroupName="/gone")
+        logs_client.delete_log_group(logGroupName="/adopted")
+        cf_client.create_stack(
+            StackName="live-stack", TemplateBody=get_template(["/adopted"], "Delete")
+        )
+        logs_client.create_log_group(logGroupName="/never-in-a-stack")
+
+    def test_lists_retained_resources(self, capfd):
+        self.app.list(region=REGION, deleted_since="1h")
+
+        # Orphans that no deleted stack recorded are not checked.
+        assert capfd.readouterr().out.splitlines() == [
+            f"{REGION},{RESOURCE_TYPE},/retained,"
+        ]
+
+    def test_skips_stacks_deleted_before(self, capfd):
+        since = datetime.now(timezone.utc) + timedelta(minutes=1)
+        self.app.list(region=REGION, deleted_since=since.isoformat())
+
+        assert capfd.readouterr().out == ""
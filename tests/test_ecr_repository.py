@@ -0,0 +1,117 @@
+import json
+from collections import defaultdict
+from threading import Lock
+
+import boto3
+import pytest
+
+from clean_orphaned_resources import clients
+from clean_orphaned_resources.resource_types.ecr_repository import EcrRepository
+
+REGION = "us-east-1"
+REPOSITORY = "purge-test-repository"
+# moto lists every image in one response, so the test pages it like ECR does.
+PAGE_SIZE = 80
+
+
+class TestPurgeRepository:
+    @pytest.fixture(autouse=True)
+    def setup(self, mocked_aws):
+        self.ecr_client = boto3.client("ecr", region_name=REGION)
+        self.ecr_client.create_repository(repositoryName=REPOSITORY)
+        self.client = clients.get_client("ecr", region_name=REGION)
+        self.calls = defaultdict(list)
+        self.next_index = 0
+        # The images that moto keeps break when one thread lists them while
+        # another deletes from them, so its calls are made one at a time.
+        self.moto_lock = Lock()
+        handlers = [
+            ("before-parameter-build", self.record_call),
+            ("before-call", self.acquire_moto_lock),
+            ("after-call", self.release_moto_lock),
+            ("after-call-error", self.release_moto_lock),
+            ("after-call.ecr.ListImages", self.page_images),
+        ]
+        for event_name, handler in handlers:
+            self.client.meta.events.register(event_name, handler)
+        yield
+        for event_name, handler in handlers:
+            self.client.meta.events.unregister(event_name, handler)
+
+    def record_call(self, model, params, **kwargs):
+        self.calls[model.name].append(params)
+        if model.name == "ListImages":
+            self.next_index = int(params.get("nextToken", 0))
+
+    def acquire_moto_lock(self, **kwargs):
+        # A value returned from before-call would replace the response.
+        self.moto_lock.acquire()
+        return None
+
+    def release_moto_lock(self, **kwargs):
+        self.moto_lock.release()
+
+    def page_images(self, parsed, **kwargs):
+        # Later pages come from the first listing, since the images of the
+        # earlier pages are being deleted meanwhile.
+        if self.next_index == 0:
+            self.image_ids = parsed["imageIds"]
+        image_ids = self.image_ids
+        parsed["imageIds"] = image_ids[self.next_index : self.next_index + PAGE_SIZE]
+        if self.next_index + PAGE_SIZE < len(image_ids):
+            parsed["nextToken"] = str(self.next_index + PAGE_SIZE)
+
+    def put_image(self, index: int, tags: tuple[str, ...] = ()) -> None:
+        manifest = json.dumps(
+            {
+                "schemaVersion": 2,
+                "mediaType": "application/vnd.docker.distribution.manifest.v2+json",
+                "layers": [{"digest": f"sha256:{index:064x}"}],
+            }
+        )
+        for tag in tags or (None,):
+            params = {"imageTag": tag} if tag else {}
+            self.ecr_client.put_image(
+                repositoryName=REPOSITORY, imageManifest=manifest, **params
+            )
+
+    def count_images(self) -> int:
+        response = self.ecr_client.list_images(repositoryName=REPOSITORY)
+        return len({image_id["imageDigest"] for image_id in response["imageIds"]})
+
+    def test_deletes_every_page_in_batches(self):
+        for index in range(200):
+            self.put_image(index)
+        # An image with several tags is listed once per tag.
+        for index in range(200, 210):
+            self.put_image(index, tags=(f"{index}-a", f"{index}-b", f"{index}-c"))
+        assert self.count_images() == 210
+
+        EcrRepository.purge_repository(self.client, REPOSITORY)
+
+        # 230 image IDs on pages of 80.
+        assert len(self.calls["ListImages"]) == 3
+        assert sorted(
+            len(params["imageIds"]) for params in self.calls["BatchDeleteImage"]
+        ) == [10, 100, 100]
+        assert self.count_images() == 0
+
+    def test_forces_deletion_of_images_pushed_during_purge(self):
+        for index in range(150):
+            self.put_image(index)
+
+        def push_image(**kwargs):
+            self.client.meta.events.unregister(
+                "after-call.ecr.BatchDeleteImage", push_image
+            )
+            self.put_image(1000, tags=("late",))
+
+        self.client.meta.events.register("after-call.ecr.BatchDeleteImage", push_image)
+
+        EcrRepository.delete_resource(REGION, REPOSITORY)
+
+        assert [params.get("force") for params in self.calls["DeleteRepository"]] == [
+            None,
+            True,
+        ]
+        assert self.ecr_client.describe_repositories()["repositories"] == []
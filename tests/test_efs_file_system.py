@@ -0,0 +1,121 @@
+import boto3
+import pytest
+from botocore.exceptions import EndpointConnectionError
+
+from clean_orphaned_resources.resource_types import efs_file_system
+from clean_orphaned_resources.resource_types.efs_file_system import PendingFileSystems
+
+REGION = "us-east-1"
+
+
+class FakeEfsClient:
+    """
+    Lists the file systems with the mount targets that the test sets, and
+    rejects the deletion of a file system while it is in use.
+    """
+
+    def __init__(self):
+        self.exceptions = boto3.client(
+            "efs",
+            region_name=REGION,
+            aws_access_key_id="testing",
+            aws_secret_access_key="testing",
+        ).exceptions
+        self.mount_targets = {}
+        self.in_use = {}
+        self.polls = 0
+        self.failing = False
+        self.delete_calls = []
+
+    def get_paginator(self, operation_name: str):
+        assert operation_name == "describe_file_systems"
+        return self
+
+    def paginate(self) -> list[dict]:
+        self.polls += 1
+        if self.failing:
+            raise EndpointConnectionError(endpoint_url="https://efs")
+        return [
+            {
+                "FileSystems": [
+                    {"FileSystemId": fs_id, "NumberOfMountTargets": count}
+                    for fs_id, count in self.mount_targets.items()
+                ]
+            }
+        ]
+
+    def delete_file_system(self, FileSystemId: str) -> None:
+        self.delete_calls.append(FileSystemId)
+        if self.in_use.get(FileSystemId, 0):
+            self.in_use[FileSystemId] -= 1
+            raise self.exceptions.FileSystemInUse(
+                {"Error": {"Code": "FileSystemInUse"}}, "DeleteFileSystem"
+            )
+        del self.mount_targets[FileSystemId]
+
+
+class TestPendingFileSystems:
+    @pytest.fixture(autouse=True)
+    def setup(self, monkeypatch):
+        self.client = FakeEfsClient()
+        monkeypatch.setattr(efs_file_system, "get_client", lambda *a, **k: self.client)
+        monkeypatch.setattr(efs_file_system, "POLL_INTERVAL", 0.01)
+        self.pending = PendingFileSystems(REGION)
+
+    def test_deletes_each_file_system_once_its_mount_targets_are_gone(self):
+        self.client.mount_targets = {"fs-ready": 0, "fs-busy": 2}
+
+        ready = self.pending.add("fs-ready")
+        busy = self.pending.add("fs-busy")
+        ready.result(timeout=5)
+
+        assert not busy.done()
+        assert self.client.delete_calls == ["fs-ready"]
+
+        self.client.mount_targets["fs-busy"] = 0
+        busy.result(timeout=5)
+
+        assert self.client.delete_calls == ["fs-ready", "fs-busy"]
+        # The poll thread stops once nothing is pending.
+        thread = self.pending._thread
+        if thread:
+            thread.join(timeout=5)
+        assert self.pending._thread is None
+
+    def test_retries_file_system_in_use(self):
+        # The mount targets are gone from the listing, but the file system
+        # still counts them for two more rounds.
+        self.client.mount_targets = {"fs-1": 0}
+        self.client.in_use = {"fs-1": 2}
+
+        self.pending.add("fs-1").result(timeout=5)
+
+        assert self.client.delete_calls == ["fs-1"] * 3
+
+    def test_file_system_in_use_past_the_deadline_fails(self, monkeypatch):
+        monkeypatch.setattr(efs_file_system, "POLL_TIMEOUT", 0.05)
+        self.client.mount_targets = {"fs-1": 0}
+        self.client.in_use = {"fs-1": 1000}
+
+        with pytest.raises(self.client.exceptions.FileSystemInUse):
+            self.pending.add("fs-1").result(timeout=5)
+
+    def test_mount_targets_past_the_deadline_fail(self, monkeypatch):
+        monkeypatch.setattr(efs_file_system, "POLL_TIMEOUT", 0.05)
+        self.client.mount_targets = {"fs-1": 1}
+
+        with pytest.raises(TimeoutError):
+            self.pending.add("fs-1").result(timeout=5)
+
+        assert self.client.delete_calls == []
+
+    def test_failed_polls_fail_the_pending_deletions(self):
+        self.client.mount_targets = {"fs-1": 1, "fs-2": 1}
+        self.client.failing = True
+
+        futures = [self.pending.add("fs-1"), self.pending.add("fs-2")]
+        for future in futures:
+            with pytest.raises(EndpointConnectionError):
+                future.result(timeout=5)
+
+        assert self.client.polls == efs_file_system.MAX_FAILED_POLLS
@@ -0,0 +1,120 @@
+from collections import defaultdict
+
+import boto3
+import pytest
+
+from clean_orphaned_resources import clients, filters
+from clean_orphaned_resources.app import CleanOrphanedResources
+
+REGION = "us-east-1"
+
+
+@pytest.fixture(autouse=True)
+def reset_filters():
+    yield
+    filters.enable()
+
+
+class TestFilters:
+    def test_parse_tag_filters(self):
+        assert filters.parse_tag_filters("env=dev,env=test,team") == {
+            "env": {"dev", "test"},
+            "team": set(),
+        }
+        # fire passes "a,b" as a tuple when it parses as a Python literal.
+        assert filters.parse_tag_filters(("env=dev", " team ")) == {
+            "env": {"dev"},
+            "team": set(),
+        }
+        assert filters.parse_tag_filters("empty=") == {"empty": {""}}
+
+    def test_match_tags(self):
+        filters.enable(tag_filter="env=dev,env=test,team")
+
+        assert filters.match("/a", {"env": "dev", "team": "x"})
+        assert filters.match("/a", {"env": "test", "team": "", "other": "y"})
+        assert not filters.match("/a", {"env": "prod", "team": "x"})
+        assert not filters.match("/a", {"env": "dev"})
+        assert not filters.match("/a", {})
+
+    def test_match_name(self):
+        filters.enable(name_prefix="/aws/lambda/", exclude_pattern="keep")
+
+        assert filters.match("/aws/lambda/pr-1", {})
+        assert not filters.match("/aws/lambda/keep-me", {})
+        assert not filters.match("/aws/codebuild/pr-1", {})
+
+    def test_no_filters_match_everything(self):
+        filters.enable()
+
+        assert not filters.has_resource_filters()
+        assert filters.match("anything", {})
+        assert filters.is_selected("AWS::S3::Bucket")
+
+    def test_unknown_resource_type(self):
+        with pytest.raises(ValueError):
+            filters.enable(types="AWS::Unknown::Type")
+
+
+class TestFilterPushdown:
+    @pytest.fixture(autouse=True)
+    def setup(self, mocked_aws):
+        self.app = CleanOrphanedResources()
+        logs_client = boto3.client("logs", region_name=REGION)
+        for name in ("/aws/lambda/pr-1", "/aws/lambda/pr-2", "/aws/lambda/main"):
+            logs_client.create_log_group(logGroupName=name)
+        s3_client = boto3.client("s3", region_name=REGION)
+        for name in ("pr-bucket", "main-bucket"):
+            s3_client.create_bucket(Bucket=name)
+
+        # Record the parameters of each call that the shared clients make.
+        self.calls = defaultdict(list)
+        self.clients = [
+            clients.get_client("logs", region_name=REGION),
+            clients.get_client("s3"),
+        ]
+        for client in self.clients:
+            client.meta.events.register("before-parameter-build", self.record_call)
+        yield
+        for client in self.clients:
+            client.meta.events.unregister("before-parameter-build", self.record_call)
+
+    def record_call(self, model, params, **kwargs):
+        self.calls[model.name].append(params)
+
+    def list(self, capfd, **kwargs) -> list[str]:
+        self.app.list(region=REGION, **kwargs)
+        return capfd.readouterr().out.splitlines()
+
+    def test_name_prefix_is_passed_to_log_group_listing(self, capfd):
+        lines = self.list(
+            capfd, types="AWS::Logs::LogGroup", name_prefix="/aws/lambda/pr-"
+        )
+
+        assert sorted(lines) == [
+            f"{REGION},AWS::Logs::LogGroup,/aws/lambda/pr-1,",
+            f"{REGION},AWS::Logs::LogGroup,/aws/lambda/pr-2,",
+        ]
+        assert [
+            params["logGroupNamePrefix"] for params in self.calls["DescribeLogGroups"]
+        ] == ["/aws/lambda/pr-"]
+        # Only the matching log groups are asked for their tags.
+        assert sorted(
+            params["logGroupName"] for params in self.calls["ListTagsLogGroup"]
+        ) == ["/aws/lambda/pr-1", "/aws/lambda/pr-2"]
+        assert "ListBuckets" not in self.calls
+
+    def test_name_prefix_is_passed_to_bucket_listing(self, capfd):
+        lines = self.list(capfd, types="AWS::S3::Bucket", name_prefix="pr-")
+
+        assert lines == [f"{REGION},AWS::S3::Bucket,pr-bucket,"]
+        assert [params.get("Prefix") for params in self.calls["ListBuckets"]] == ["pr-"]
+        assert "DescribeLogGroups" not in self.calls
+
+    def test_exclude_pattern_skips_tag_reads(self, capfd):
+        lines = self.list(capfd, types="AWS::Logs::LogGroup", exclude_pattern="pr-")
+
+        assert lines == [f"{REGION},AWS::Logs::LogGroup,/aws/lambda/main,"]
+        assert [
+            params["logGroupName"] for params in self.calls["ListTagsLogGroup"]
+        ] == ["/aws/lambda/main"]
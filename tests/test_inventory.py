@@ -0,0 +1,87 @@
+import io
+import json
+import sys
+
+import pytest
+
+from clean_orphaned_resources import inventory
+from clean_orphaned_resources.app import CleanOrphanedResources
+
+REGION = "us-east-1"
+RESOURCE_TYPE = "AWS::Logs::LogGroup"
+
+
+class TestInventory:
+    def test_csv_round_trip(self):
+        line = inventory.format_line(
+            REGION, RESOURCE_TYPE, "/plain", {"CreatedBy": "TestUser", "Empty": ""}
+        )
+        assert line == f"{REGION},{RESOURCE_TYPE},/plain,CreatedBy=TestUser,Empty="
+        assert inventory.parse_line(line + "\n") == (
+            REGION,
+            RESOURCE_TYPE,
+            "/plain",
+            {"CreatedBy": "TestUser", "Empty": ""},
+        )
+
+    def test_csv_details_are_a_comment(self):
+        line = inventory.format_line(
+            REGION, RESOURCE_TYPE, "/plain", {"a": "1"}, details="stored_bytes=0"
+        )
+        assert line.endswith("#stored_bytes=0")
+        assert inventory.parse_line(line) == (
+            REGION,
+            RESOURCE_TYPE,
+            "/plain",
+            {"a": "1"},
+        )
+        assert not inventory.is_resource_line("#removed " + line)
+        assert not inventory.is_resource_line("\n")
+
+    def test_jsonl_round_trip_keeps_separators(self):
+        name = "/weird#name,with=separators"
+        tags = {"a": "1,2", "b": "x=y#z", "c": ""}
+        line = inventory.format_line(
+            REGION, RESOURCE_TYPE, name, tags, details="d", output_format="jsonl"
+        )
+        assert json.loads(line)["version"] == inventory.INVENTORY_VERSION
+        assert inventory.is_resource_line(line)
+        assert inventory.parse_line(line) == (REGION, RESOURCE_TYPE, name, tags)
+
+    def test_jsonl_tags_are_optional(self):
+        line = json.dumps(
+            {"version": 1, "region": REGION, "type": RESOURCE_TYPE, "name": "/x"}
+        )
+        assert inventory.parse_line(line) == (REGION, RESOURCE_TYPE, "/x", {})
+
+    @pytest.mark.parametrize(
+        "record",
+        [
+            {"version": 1, "region": REGION, "type": RESOURCE_TYPE},
+            {"version": 2, "region": REGION, "type": RESOURCE_TYPE, "name": "/x"},
+        ],
+    )
+    def test_jsonl_invalid_records_raise_value_error(self, record):
+        with pytest.raises(ValueError):
+            inventory.parse_line(json.dumps(record))
+
+    @pytest.mark.parametrize(
+        "line, missing",
+        [(f"{REGION},{RESOURCE_TYPE}", "name"), (f"{REGION}#comment", "type, name")],
+    )
+    def test_csv_incomplete_lines_raise_value_error(self, line, missing):
+        with pytest.raises(ValueError, match=f"Missing fields .*: {missing}$"):
+            inventory.parse_line(line + "\n")
+
+    def test_destroy_fails_on_incomplete_record(self, mocked_aws, tmp_path):
+        line = json.dumps({"version": 1, "region": REGION, "type": RESOURCE_TYPE})
+        sys.stdin = io.StringIO(line + "\n")
+
+        with pytest.raises(SystemExit) as exc_info:
+            CleanOrphanedResources().destroy(journal=str(tmp_path / "journal"))
+        assert exc_info.value.code == 1
+
+        records = [json.loads(l) for l in open(tmp_path / "journal")]
+        assert records == [
+            {"key": None, "line": 1, "status": "failed", "error": records[0]["error"]}
+        ]
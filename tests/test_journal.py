@@ -0,0 +1,72 @@
+import io
+import json
+import sys
+
+import boto3
+import pytest
+
+from clean_orphaned_resources import journal
+from clean_orphaned_resources.app import CleanOrphanedResources
+
+REGION = "us-east-1"
+RESOURCE_TYPE = "AWS::Logs::LogGroup"
+
+
+class TestJournal:
+    @pytest.fixture(autouse=True)
+    def setup(self, mocked_aws, tmp_path):
+        self.app = CleanOrphanedResources()
+        self.journal_path = str(tmp_path / "destroy.journal")
+        self.logs_client = boto3.client("logs", region_name=REGION)
+        for name in ("/deleted_before", "/not_deleted_yet"):
+            self.logs_client.create_log_group(logGroupName=name)
+        self.input = "".join(
+            f"{REGION},{RESOURCE_TYPE},{name},\n"
+            for name in ("/deleted_before", "/not_deleted_yet")
+        )
+
+    def destroy(self, **kwargs) -> None:
+        sys.stdin = io.StringIO(self.input)
+        self.app.destroy(journal=self.journal_path, **kwargs)
+
+    def get_log_group_names(self) -> list[str]:
+        response = self.logs_client.describe_log_groups()
+        return [log_group["logGroupName"] for log_group in response["logGroups"]]
+
+    def test_resume_skips_deleted_resources(self):
+        with open(self.journal_path, "w") as f:
+            record = {
+                "key": [REGION, RESOURCE_TYPE, "/deleted_before"],
+                "line": 1,
+                "status": "deleted",
+            }
+            f.write(json.dumps(record) + "\n")
+            # An interrupted run may leave its last record cut short.
+            f.write('{"key": ["us-east-1", "AWS::Logs::LogGroup", "/not_del')
+
+        self.destroy(resume=True)
+
+        # The journal says /deleted_before is gone, so it is left alone even
+        # though it exists here.
+        assert self.get_log_group_names() == ["/deleted_before"]
+        with open(self.journal_path) as f:
+            lines = f.read().splitlines()
+        assert len(lines) == 3
+        assert json.loads(lines[-1]) == {
+            "key": [REGION, RESOURCE_TYPE, "/not_deleted_yet"],
+            "line": 2,
+            "status": "deleted",
+        }
+
+    def test_journal_records_deletions(self):
+        self.destroy()
+
+        assert self.get_log_group_names() == []
+        assert journal.load_completed(self.journal_path) == {
+            (REGION, RESOURCE_TYPE, "/deleted_before"),
+            (REGION, RESOURCE_TYPE, "/not_deleted_yet"),
+        }
+
+    def test_resume_requires_journal(self):
+        with pytest.raises(ValueError):
+            self.app.destroy(resume=True)
@@ -0,0 +1,27 @@
+import boto3
+import pytest
+
+from clean_orphaned_resources.app import CleanOrphanedResources
+
+REGION = "us-east-1"
+
+
+class TestKeyMetadata:
+    @pytest.fixture(autouse=True)
+    def setup(self, mocked_aws):
+        self.app = CleanOrphanedResources()
+        self.kms_client = boto3.client("kms", region_name=REGION)
+        self.key_id = self.kms_client.create_key()["KeyMetadata"]["KeyId"]
+
+    def list(self, capfd) -> list[str]:
+        self.app.list(region=REGION, types="AWS::KMS::Key")
+        return capfd.readouterr().out.splitlines()
+
+    def test_each_run_describes_keys_again(self, capfd):
+        assert self.list(capfd) == [f"{REGION},AWS::KMS::Key,{self.key_id},"]
+
+        # A key disabled since the previous run in the same process is not
+        # deletable any more.
+        self.kms_client.disable_key(KeyId=self.key_id)
+
+        assert self.list(capfd) == []
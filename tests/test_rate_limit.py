@@ -0,0 +1,89 @@
+import time
+
+import botocore.exceptions
+import pytest
+
+from clean_orphaned_resources import rate_limit, snapshot
+from clean_orphaned_resources.resource_types.base import handle_boto3_exceptions
+
+
+def client_error(code: str) -> botocore.exceptions.ClientError:
+    return botocore.exceptions.ClientError(
+        {"Error": {"Code": code, "Message": code}}, "ListThings"
+    )
+
+
+class TestTokenBucket:
+    def test_throttling_halves_the_rate(self):
+        bucket = rate_limit.TokenBucket(10.0)
+
+        bucket.on_throttled()
+        assert bucket.rate == 5.0
+        bucket.on_throttled()
+        assert bucket.rate == 2.5
+
+        for _ in range(10):
+            bucket.on_throttled()
+        assert bucket.rate == rate_limit.MIN_RATE
+
+    def test_successes_recover_the_rate(self):
+        bucket = rate_limit.TokenBucket(10.0)
+        bucket.on_throttled()
+
+        # Each success regains a hundredth of the maximum rate.
+        for _ in range(25):
+            bucket.on_success()
+        assert bucket.rate == pytest.approx(7.5)
+
+        for _ in range(100):
+            bucket.on_success()
+        assert bucket.rate == 10.0
+
+    def test_throttling_drains_the_tokens(self):
+        bucket = rate_limit.TokenBucket(10.0)
+        bucket.on_throttled()
+
+        # The next request waits for a whole token at the halved rate.
+        started = time.monotonic()
+        bucket.acquire()
+        assert time.monotonic() - started >= 0.15
+
+
+class TestHandleBoto3Exceptions:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        yield
+        snapshot.disable()
+
+    def test_function_raises_throttling_errors(self):
+        @handle_boto3_exceptions([])
+        def list_things(code):
+            raise client_error(code)
+
+        assert list_things("AccessDeniedException") == []
+        with pytest.raises(botocore.exceptions.ClientError):
+            list_things("ThrottlingException")
+
+    def test_generator_raises_throttling_errors(self):
+        @handle_boto3_exceptions([])
+        def list_things(code):
+            yield "first"
+            raise client_error(code)
+
+        # Other errors end the listing after what it found so far.
+        assert list(list_things("AccessDeniedException")) == ["first"]
+        things = []
+        with pytest.raises(botocore.exceptions.ClientError):
+            for thing in list_things("ThrottlingException"):
+                things.append(thing)
+        assert things == ["first"]
+
+    def test_generator_raises_every_error_with_snapshots(self, tmp_path):
+        @handle_boto3_exceptions([])
+        def list_things():
+            yield "first"
+            raise client_error("AccessDeniedException")
+
+        snapshot.enable(str(tmp_path), "123456789012")
+        with pytest.raises(botocore.exceptions.ClientError):
+            list(list_things())
@@ -0,0 +1,114 @@
+import hashlib
+import string
+from collections import Counter
+from threading import Lock
+
+import boto3
+import pytest
+
+from clean_orphaned_resources import clients
+from clean_orphaned_resources.resource_types.s3_bucket import S3Bucket
+
+REGION = "us-east-1"
+BUCKET = "purge-test-bucket"
+
+
+class TestPurgeBucket:
+    @pytest.fixture(autouse=True)
+    def setup(self, mocked_aws):
+        self.s3_client = boto3.client("s3", region_name=REGION)
+        self.s3_client.create_bucket(Bucket=BUCKET)
+        self.client = clients.get_client("s3", region_name=REGION)
+        self.calls = Counter()
+        self.client.meta.events.register("before-parameter-build", self.record_call)
+        # The versions that moto keeps break when one thread lists them while
+        # another deletes from them, so its calls are made one at a time.
+        self.moto_lock = Lock()
+        self.client.meta.events.register("before-call", self.acquire_moto_lock)
+        self.client.meta.events.register("after-call", self.release_moto_lock)
+        self.client.meta.events.register("after-call-error", self.release_moto_lock)
+        yield
+        self.client.meta.events.unregister("before-parameter-build", self.record_call)
+        self.client.meta.events.unregister("before-call", self.acquire_moto_lock)
+        self.client.meta.events.unregister("after-call", self.release_moto_lock)
+        self.client.meta.events.unregister("after-call-error", self.release_moto_lock)
+
+    def record_call(self, model, **kwargs):
+        self.calls[model.name] += 1
+
+    def acquire_moto_lock(self, **kwargs):
+        # A value returned from before-call would replace the response.
+        self.moto_lock.acquire()
+        return None
+
+    def release_moto_lock(self, **kwargs):
+        self.moto_lock.release()
+
+    def put_objects(self, keys: list[str]) -> None:
+        for key in keys:
+            self.s3_client.put_object(Bucket=BUCKET, Key=key, Body=b"x")
+
+    def set_versioning(self, status: str) -> None:
+        self.s3_client.put_bucket_versioning(
+            Bucket=BUCKET, VersioningConfiguration={"Status": status}
+        )
+
+    def count_versions(self) -> int:
+        paginator = self.s3_client.get_paginator("list_object_versions")
+        return sum(
+            len(page.get("Versions", [])) + len(page.get("DeleteMarkers", []))
+            for page in paginator.paginate(Bucket=BUCKET)
+        )
+
+    def test_purge_root_level_keys(self):
+        # CDK asset buckets keep their objects at the root as <hash>.zip.
+        keys = [f"{hashlib.sha256(bytes(i)).hexdigest()}.zip" for i in range(2500)]
+        self.put_objects(keys + ["assets/nested/key.json"])
+
+        objects, partitions = S3Bucket.list_partitions(self.client, BUCKET, False)
+        assert len(objects) == 1000
+        # The keys after the first page are split by their first character.
+        last_key = objects[-1]["Key"]
+        assert partitions[0][0] == last_key
+        assert [partition[2] for partition in partitions] == [
+            character
+            for character in string.digits + string.ascii_lowercase
+            if character > last_key
+        ] + [None]
+        assert self.calls["ListObjectsV2"] == 1
+
+        progress = S3Bucket.purge_bucket(self.client, BUCKET)
+
+        assert progress.deleted == 2501
+        assert progress.errors == 0
+        assert "Contents" not in self.s3_client.list_objects_v2(Bucket=BUCKET)
+
+    def test_purge_versions_and_delete_markers(self):
+        self.set_versioning("Enabled")
+        keys = [f"key-{i:04d}" for i in range(700)]
+        self.put_objects(keys)
+        self.put_objects(keys[:300])
+        self.s3_client.delete_objects(
+            Bucket=BUCKET,
+            Delete={"Objects": [{"Key": key} for key in keys[300:600]]},
+        )
+        assert self.count_versions() == 1300
+
+        progress = S3Bucket.purge_bucket(self.client, BUCKET)
+
+        assert progress.deleted == 1300
+        assert self.count_versions() == 0
+
+    def test_purge_suspended_versioning(self):
+        self.set_versioning("Enabled")
+        self.put_objects([f"enabled-{i:04d}" for i in range(600)])
+        self.set_versioning("Suspended")
+        # The versions created while versioning was enabled stay until they
+        # are deleted by version.
+        self.put_objects([f"suspended-{i:04d}" for i in range(600)])
+        assert self.count_versions() == 1200
+
+        S3Bucket.purge_bucket(self.client, BUCKET)
+
+        assert self.count_versions() == 0
+        self.s3_client.delete_bucket(Bucket=BUCKET)
@@ -0,0 +1,114 @@
+import glob
+import json
+import os
+import time
+from collections import Counter
+
+import boto3
+import botocore.exceptions
+import pytest
+
+from clean_orphaned_resources import clients, snapshot
+from clean_orphaned_resources.app import CleanOrphanedResources
+from clean_orphaned_resources.resource_types.cloudwatch_log_group import (
+    CloudWatchLogs,
+)
+
+REGION = "us-east-1"
+RESOURCE_TYPE = "AWS::Logs::LogGroup"
+
+
+class TestSinceSnapshot:
+    @pytest.fixture(autouse=True)
+    def setup(self, mocked_aws, tmp_path):
+        self.app = CleanOrphanedResources()
+        self.cache_dir = str(tmp_path)
+        self.logs_client = boto3.client("logs", region_name=REGION)
+        self.logs_client.create_log_group(logGroupName="/kept", tags={"env": "dev"})
+        self.logs_client.create_log_group(logGroupName="/removed")
+
+        self.calls = Counter()
+        self.client = clients.get_client("logs", region_name=REGION)
+        self.client.meta.events.register("before-parameter-build", self.record_call)
+        yield
+        self.client.meta.events.unregister("before-parameter-build", self.record_call)
+        snapshot.disable()
+
+    def record_call(self, model, **kwargs):
+        self.calls[model.name] += 1
+
+    def list(self, capfd) -> list[str]:
+        self.calls.clear()
+        self.app.list(
+            region=REGION,
+            types=RESOURCE_TYPE,
+            since_snapshot=True,
+            cache_dir=self.cache_dir,
+        )
+        return sorted(capfd.readouterr().out.splitlines())
+
+    def get_snapshot_path(self) -> str:
+        (path,) = glob.glob(
+            os.path.join(self.cache_dir, "snapshots", "*", REGION, "*.json")
+        )
+        return path
+
+    def test_prints_new_and_removed_orphans(self, capfd):
+        assert self.list(capfd) == [
+            f"{REGION},{RESOURCE_TYPE},/kept,env=dev",
+            f"{REGION},{RESOURCE_TYPE},/removed,",
+        ]
+
+        self.logs_client.delete_log_group(logGroupName="/removed")
+        self.logs_client.create_log_group(logGroupName="/added")
+
+        assert self.list(capfd) == [
+            f"#removed {REGION},{RESOURCE_TYPE},/removed,",
+            f"{REGION},{RESOURCE_TYPE},/added,",
+        ]
+        assert self.list(capfd) == []
+
+    def test_reuses_tags_until_they_are_a_day_old(self, capfd):
+        self.list(capfd)
+        assert self.calls["ListTagsLogGroup"] == 2
+
+        # Both log groups are older than the snapshot, so their tags are reused.
+        self.list(capfd)
+        assert self.calls["ListTagsLogGroup"] == 0
+
+        path = self.get_snapshot_path()
+        with open(path) as f:
+            data = json.load(f)
+        day_and_hour_ago = int(time.time() * 1000) - 25 * 60 * 60 * 1000
+        data["tags_read_at"]["/kept"] = day_and_hour_ago
+        with open(path, "w") as f:
+            json.dump(data, f)
+
+        self.list(capfd)
+        assert self.calls["ListTagsLogGroup"] == 1
+
+        # The tags read again start a new day.
+        self.list(capfd)
+        assert self.calls["ListTagsLogGroup"] == 0
+
+    def test_failed_listing_keeps_previous_snapshot(self, capfd, monkeypatch):
+        self.list(capfd)
+        with open(self.get_snapshot_path()) as f:
+            previous = f.read()
+
+        def list_log_groups(client, prefix=""):
+            yield from self.logs_client.describe_log_groups(limit=1)["logGroups"]
+            raise botocore.exceptions.ClientError(
+                {"Error": {"Code": "ExpiredTokenException", "Message": "expired"}},
+                "DescribeLogGroups",
+            )
+
+        monkeypatch.setattr(CloudWatchLogs, "list_log_groups", list_log_groups)
+
+        with pytest.raises(SystemExit):
+            self.list(capfd)
+
+        # /removed was not listed, but it is not reported as removed.
+        assert capfd.readouterr().out == ""
+        with open(self.get_snapshot_path()) as f:
+            assert f.read() == previous
@@ -0,0 +1,86 @@
+import botocore.exceptions
+import boto3
+import pytest
+
+from clean_orphaned_resources import clients, stack_cache
+from clean_orphaned_resources.app import CleanOrphanedResources
+
+REGION = "us-east-1"
+ACCOUNT_ID = "123456789012"
+TEMPLATE_BODY = """
+Resources:
+  LogGroup:
+    Type: AWS::Logs::LogGroup
+    Properties:
+      LogGroupName: cloudformation_created_log_group
+"""
+
+
+class TestStackCache:
+    @pytest.fixture(autouse=True)
+    def setup(self, mocked_aws, tmp_path):
+        self.app = CleanOrphanedResources()
+        self.cache_dir = str(tmp_path)
+        self.cache_path = stack_cache.get_cache_path(self.cache_dir, ACCOUNT_ID, REGION)
+
+        self.cf_client = boto3.client("cloudformation", region_name=REGION)
+        self.stack_id = self.cf_client.create_stack(
+            StackName="stack-cache-test-stack", TemplateBody=TEMPLATE_BODY
+        )["StackId"]
+        boto3.client("logs", region_name=REGION).create_log_group(
+            logGroupName="directly_created_log_group"
+        )
+
+        # Count the stacks read by the shared client, and fail them on demand.
+        self.stack_reads = 0
+        self.throttled = False
+        self.client = clients.get_client("cloudformation", region_name=REGION)
+        self.client.meta.events.register(
+            "before-call.cloudformation.ListStackResources", self.before_read
+        )
+        yield
+        self.client.meta.events.unregister(
+            "before-call.cloudformation.ListStackResources", self.before_read
+        )
+
+    def before_read(self, **kwargs):
+        self.stack_reads += 1
+        if self.throttled:
+            raise botocore.exceptions.ClientError(
+                {"Error": {"Code": "Throttling", "Message": "Rate exceeded"}},
+                "ListStackResources",
+            )
+
+    def list(self, capfd) -> str:
+        self.app.list(region=REGION, cache=True, cache_dir=self.cache_dir)
+        return capfd.readouterr().out
+
+    def test_reuses_unchanged_stacks(self, capfd):
+        out = self.list(capfd)
+        assert "directly_created_log_group" in out
+        assert "cloudformation_created_log_group" not in out
+        assert self.stack_reads == 1
+
+        out = self.list(capfd)
+        assert "cloudformation_created_log_group" not in out
+        assert self.stack_reads == 1
+
+    def test_evicts_deleted_stacks(self, capfd):
+        self.list(capfd)
+        assert self.stack_id in stack_cache.load(self.cache_path)
+
+        self.cf_client.delete_stack(StackName=self.stack_id)
+        self.list(capfd)
+        assert self.stack_id not in stack_cache.load(self.cache_path)
+
+    def test_does_not_cache_failed_reads(self, capfd):
+        self.throttled = True
+        with pytest.raises(SystemExit) as exc_info:
+            self.list(capfd)
+        assert exc_info.value.code == 1
+        assert capfd.readouterr().out == ""
+        assert stack_cache.load(self.cache_path) == {}
+
+        self.throttled = False
+        out = self.list(capfd)
+        assert "cloudformation_created_log_group" not in out
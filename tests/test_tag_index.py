@@ -0,0 +1,62 @@
+from collections import Counter
+from datetime import timedelta
+
+import boto3
+import pytest
+
+from clean_orphaned_resources import clients
+from clean_orphaned_resources.app import CleanOrphanedResources
+from clean_orphaned_resources.resource_types import tag_index
+from clean_orphaned_resources.resource_types.cloudwatch_log_group import (
+    CloudWatchLogs,
+)
+
+REGION = "us-east-1"
+RESOURCE_TYPE = "AWS::Logs::LogGroup"
+
+
+class TestBulkTags:
+    @pytest.fixture(autouse=True)
+    def setup(self, mocked_aws, monkeypatch):
+        # moto reports log groups to the Tagging API as logs:loggroup.
+        monkeypatch.setattr(CloudWatchLogs, "TAGGING_RESOURCE_TYPE", "logs:loggroup")
+        self.app = CleanOrphanedResources()
+        logs_client = boto3.client("logs", region_name=REGION)
+        logs_client.create_log_group(logGroupName="/tagged", tags={"env": "dev"})
+        for i in range(3):
+            logs_client.create_log_group(logGroupName=f"/untagged-{i}")
+
+        self.calls = Counter()
+        self.client = clients.get_client("logs", region_name=REGION)
+        self.client.meta.events.register("before-parameter-build", self.record_call)
+        yield
+        self.client.meta.events.unregister("before-parameter-build", self.record_call)
+        tag_index.disable()
+
+    def record_call(self, model, **kwargs):
+        self.calls[model.name] += 1
+
+    def list(self, capfd) -> list[str]:
+        self.app.list(region=REGION, types=RESOURCE_TYPE, bulk_tags=True)
+        return sorted(capfd.readouterr().out.splitlines())
+
+    def test_untagged_resources_are_not_looked_up(self, capfd, monkeypatch):
+        # The log groups were all created before the scan started.
+        monkeypatch.setattr(tag_index, "SCAN_LAG", timedelta(0))
+
+        lines = self.list(capfd)
+
+        assert lines == [
+            f"{REGION},{RESOURCE_TYPE},/tagged,env=dev",
+            f"{REGION},{RESOURCE_TYPE},/untagged-0,",
+            f"{REGION},{RESOURCE_TYPE},/untagged-1,",
+            f"{REGION},{RESOURCE_TYPE},/untagged-2,",
+        ]
+        assert self.calls["ListTagsLogGroup"] == 0
+
+    def test_resources_created_around_the_scan_are_looked_up(self, capfd):
+        lines = self.list(capfd)
+
+        assert len(lines) == 4
+        # The Tagging API may not know resources this new yet.
+        assert self.calls["ListTagsLogGroup"] == 3